@@ -4,12 +4,22 @@ from datetime import datetime
 import aiohttp
 import asyncio
 from dataclasses import dataclass
-from typing import List, Dict, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Optional, Set, TextIO, Tuple
 import json
 import os
 from dotenv import load_dotenv
 import logging
 import argparse
+import sys
+import time
+
+# Share the SHA-keyed commit cache with the backend analyzer
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from analyzer import GITHUB_PAGE_SIZE
+from analyzer.commit_cache import CommitCache, get_commit_cache
+from analyzer.git_source import LocalGitSource
+from analyzer.patch_features import FileFeatures, analyze_patches, shutdown_pool, summarize_languages
+from analyzer.scheduler import RequestScheduler
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,8 +27,99 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Commit details fetched at once
+DEFAULT_CONCURRENCY = 8
+
+def default_output(owner: str, repo: str) -> str:
+    """Where a repository's commits are exported (one JSON object per line) unless told otherwise"""
+    return f'{owner}_{repo}.ndjson'.lower()
+
+class ExportConflict(Exception):
+    """Raised when an output holds data this export cannot resume: another repository's, or no checkpoint"""
+
+class ExportCheckpoint:
+    """
+    Record of the commits already written to an export, kept next to it in
+    <output>.checkpoint: a JSON header naming the repository, then the SHA of
+    each record once that record has been flushed to the output.
+
+    Opening an existing checkpoint resumes the export: the SHAs are loaded so
+    those commits can be skipped, a partially written last record (from a
+    crash mid-write) is cut off, and complete records whose SHA did not make
+    it into the checkpoint are added to it. An output is never truncated
+    unless restart is asked for.
+    """
+
+    def __init__(self, output: str, owner: str, repo: str):
+        self.output = output
+        self.path = output + '.checkpoint'
+        self.repository = f'{owner}/{repo}'.lower()
+        self.completed: Set[str] = set()
+        self._file: Optional[TextIO] = None
+
+    def open(self, restart: bool = False) -> TextIO:
+        """
+        Loads or starts the checkpoint and returns the output opened for appending.
+
+        Raises:
+            ExportConflict: If the output is not empty and, without restart, cannot be resumed
+        """
+        unrecorded = []
+        # A checkpoint whose output is gone has nothing left to resume
+        if restart or not os.path.exists(self.path) or not os.path.exists(self.output):
+            if not restart and os.path.exists(self.output) and os.path.getsize(self.output) > 0:
+                raise ExportConflict(f'{self.output} exists without a checkpoint; pass --restart to overwrite it '
+                                f'or choose another --output')
+            with open(self.path, 'w') as checkpoint:
+                checkpoint.write(json.dumps({'repository': self.repository}) + '\n')
+            open(self.output, 'w').close()
+        else:
+            with open(self.path, 'r') as checkpoint:
+                header = json.loads(checkpoint.readline() or '{}')
+                if header.get('repository') != self.repository:
+                    raise ExportConflict(f"{self.output} is an export of {header.get('repository')}; pass --restart "
+                                    f"to overwrite it or choose another --output")
+                self.completed = {line.strip() for line in checkpoint if line.strip()}
+            unrecorded = self._recover_output()
+        self._file = open(self.path, 'a')
+        for sha in unrecorded:
+            self.record(sha)
+        return open(self.output, 'a')
+
+    def _recover_output(self) -> List[str]:
+        """Cuts off a torn last record and returns the SHAs of complete records missing from the checkpoint"""
+        unrecorded = []
+        valid_end = 0
+        with open(self.output, 'rb') as out:
+            for line in out:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    sha = json.loads(line)['sha']
+                except (ValueError, KeyError):
+                    break
+                valid_end += len(line)
+                if sha not in self.completed:
+                    unrecorded.append(sha)
+        if valid_end < os.path.getsize(self.output):
+            logger.warning(f"Dropping a partially written record at the end of {self.output}")
+            os.truncate(self.output, valid_end)
+        return unrecorded
+
+    def record(self, sha: str):
+        """Marks a commit as exported; call once its record has been flushed"""
+        self._file.write(sha + '\n')
+        self._file.flush()
+        self.completed.add(sha)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
 class RepositoryAnalyzer:
-    def __init__(self, github_token: str):
+    def __init__(self, github_token: str, commit_cache: Optional[CommitCache] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY):
         self.github_token = github_token
         self.headers = {
             'Authorization': f'token {github_token}',
@@ -26,124 +127,188 @@ class RepositoryAnalyzer:
         }
         self.commit_graph = nx.DiGraph()
         self.commit_summaries = []
+        self.commit_cache = commit_cache or get_commit_cache()
+        self.concurrency = max(1, concurrency)
+        # Retries and rate-limit pauses for the parallel detail fetches
+        self.scheduler = RequestScheduler(max_per_host=self.concurrency)
+
+    async def _fetch_commit_detail(self, session: aiohttp.ClientSession, owner: str, repo: str, commit: Dict) -> Dict:
+        """Fetch detailed commit information including file changes, reading through the commit cache"""
+        cached = await asyncio.to_thread(self.commit_cache.get, owner, repo, commit['sha'])
+        if cached is not None:
+            return cached
 
-    async def _fetch_commit_detail(self, session: aiohttp.ClientSession, commit_url: str) -> Dict:
-        """Fetch detailed commit information including file changes"""
-        async with session.get(commit_url, headers=self.headers) as response:
-            if response.status != 200:
-                raise Exception(f'Failed to fetch commit detail: {await response.text()}')
-            return await response.json()
+        commit_detail = await self.scheduler.request_json(session, 'GET', commit['url'], headers=self.headers)
 
-    async def _analyze_code_changes(self, files: List[Dict]) -> str:
+        await asyncio.to_thread(self.commit_cache.put, owner, repo, commit['sha'], commit_detail)
+        return commit_detail
+
+    def _analyze_code_changes(self, features: List[FileFeatures]) -> str:
         """Generate detailed analysis of code changes"""
         analysis = []
         
-        total_additions = 0
-        total_deletions = 0
+        total_additions = sum(file.additions for file in features)
+        total_deletions = sum(file.deletions for file in features)
         
-        for file in files:
-            filename = file.get('filename', 'unknown')
-            status = file.get('status', 'unknown')
-            additions = file.get('additions', 0)
-            deletions = file.get('deletions', 0)
-            patch = file.get('patch', '')
-            
-            total_additions += additions
-            total_deletions += deletions
-            
+        for file in features:
             # Analyze file changes
             change_type = ''
-            if status == 'added':
+            if file.status == 'added':
                 change_type = 'Added new file'
-            elif status == 'modified':
+            elif file.status == 'modified':
                 change_type = 'Modified existing file'
-            elif status == 'removed':
+            elif file.status == 'removed':
                 change_type = 'Removed file'
-            elif status == 'renamed':
-                change_type = f"Renamed file from {file.get('previous_filename', 'unknown')}"
+            elif file.status == 'renamed':
+                change_type = f"Renamed file from {file.previous_filename or 'unknown'}"
             
-            # Analyze the actual changes
-            changes = []
-            if patch:
-                patch_lines = patch.split('\n')
-                for line in patch_lines:
-                    if line.startswith('+') and not line.startswith('+++'):
-                        changes.append('Added: ' + line[1:].strip())
-                    elif line.startswith('-') and not line.startswith('---'):
-                        changes.append('Removed: ' + line[1:].strip())
-            
-            file_analysis = f"{change_type} '{filename}' with {additions} additions and {deletions} deletions."
-            if changes:
-                file_analysis += "\nKey changes:\n- " + "\n- ".join(changes[:5])  # Limit to 5 key changes
+            file_analysis = (f"{change_type} '{file.filename}' ({file.language}) with {file.additions} additions "
+                             f"and {file.deletions} deletions in {file.hunks} hunks.")
+            if file.top_changes:
+                changes = [('Added: ' if marker == '+' else 'Removed: ') + text for marker, text in file.top_changes]
+                file_analysis += "\nKey changes:\n- " + "\n- ".join(changes)
             
             analysis.append(file_analysis)
         
-        overall_analysis = f"Summary: Modified {len(files)} files with {total_additions} additions and {total_deletions} deletions.\n\n"
+        overall_analysis = f"Summary: Modified {len(features)} files with {total_additions} additions and {total_deletions} deletions.\n\n"
         overall_analysis += "\n\n".join(analysis)
         
         return overall_analysis
 
-    async def _fetch_commits(self, session: aiohttp.ClientSession, owner: str, repo: str, limit: int) -> List[Dict]:
-        """Fetches commit history from GitHub API"""
-        url = f'https://api.github.com/repos/{owner}/{repo}/commits?per_page={limit}'
+    async def _iter_commits(self, session: aiohttp.ClientSession, owner: str, repo: str, limit: int) -> AsyncIterator[Dict]:
+        """Yields up to limit commits from the GitHub API, newest first, one page at a time"""
         print(f"Fetching commits from {owner}/{repo}...")
-        
-        async with session.get(url, headers=self.headers) as response:
-            if response.status != 200:
-                raise Exception(f'Failed to fetch commits: {await response.text()}')
-            return await response.json()
+        # The page size must stay the same from page to page for the page numbers to line up
+        per_page = min(GITHUB_PAGE_SIZE, limit)
+        page = 1
+        while limit > 0:
+            url = f'https://api.github.com/repos/{owner}/{repo}/commits?per_page={per_page}&page={page}'
+            commits = await self.scheduler.request_json(session, 'GET', url, headers=self.headers)
+            for commit in commits[:limit]:
+                yield commit
+            limit -= len(commits)
+            if len(commits) < per_page:
+                return
+            page += 1
 
-    async def analyze_repository(self, owner: str, repo: str, limit: int = 50) -> None:
-        """Analyzes a repository and saves the results."""
+    async def _export_commit(self, session: aiohttp.ClientSession, owner: str, repo: str, commit: Dict,
+                             git_source: Optional[LocalGitSource]) -> Dict:
+        """Fetches a commit's changes and builds its export record"""
+        sha = commit['sha']
+        if git_source:
+            commit_detail = await git_source.fetch_detail(sha)
+        else:
+            commit_detail = await self._fetch_commit_detail(session, owner, repo, commit)
+
+        # Get the code changes and analysis; large patches are processed off the event loop
+        files = commit_detail.get('files', [])
+        features = await analyze_patches(files)
+        analysis = self._analyze_code_changes(features)
+
+        # Extract code snippets from patches
+        code_snippets = []
+        for file in files:
+            if 'patch' in file:
+                code_snippets.append(f"File: {file['filename']}\n{file['patch']}")
+
+        return {
+            "sha": sha,
+            "message": commit['commit']['message'],
+            "author": commit['commit']['author']['name'],
+            "date": commit['commit']['author']['date'],
+            "files_changed": [f['filename'] for f in files],
+            "code_changes": code_snippets[:3],  # Limit to 3 files for brevity
+            "analysis": analysis,
+            "stats": {
+                "total_files_changed": len(files),
+                "total_additions": sum(f.additions for f in features),
+                "total_deletions": sum(f.deletions for f in features),
+                "total_hunks": sum(f.hunks for f in features)
+            },
+            "languages": summarize_languages(features),
+            "file_stats": [f.to_dict() for f in features]
+        }
+
+    async def analyze_repository(self, owner: str, repo: str, limit: int = 50, local_path: Optional[str] = None,
+                                 output: Optional[str] = None, restart: bool = False) -> str:
+        """
+        Analyzes a repository and writes one JSON record per commit to output
+        (NDJSON, by default <owner>_<repo>.ndjson), returning the path written.
+        With local_path, history is read from a local clone.
+
+        Commits are listed page by page and handed to a pool of concurrency
+        workers through a bounded queue; each worker fetches a commit's
+        details and appends its record as soon as it is built, so memory stays
+        flat however long the history is. Records are written in completion
+        order, not history order.
+
+        Progress is checkpointed (see ExportCheckpoint): re-running an export
+        into the same output resumes it, skipping the commits already written,
+        unless restart is set.
+        """
         print(f"Starting detailed analysis of {owner}/{repo}")
-        
+        started = time.monotonic()
+        exported = 0
+        failed = 0
+
+        output = output or default_output(owner, repo)
+        checkpoint = ExportCheckpoint(output, owner, repo)
+        out = checkpoint.open(restart)
+        resumed = len(checkpoint.completed)
+        if resumed:
+            print(f"Resuming export into {output}: {resumed} commits already written")
+
         async with aiohttp.ClientSession() as session:
-            commits = await self._fetch_commits(session, owner, repo, limit)
-            print(f"Found {len(commits)} commits to analyze")
-            
-            analyzed_commits = []
-            for commit in commits:
-                sha = commit['sha']
-                print(f"Analyzing commit {sha[:7]}...")
-                
-                # Fetch detailed commit information
-                commit_detail = await self._fetch_commit_detail(session, commit['url'])
-                
-                # Get the code changes and analysis
-                files = commit_detail.get('files', [])
-                analysis = await self._analyze_code_changes(files)
-                
-                # Extract code snippets from patches
-                code_snippets = []
-                for file in files:
-                    if 'patch' in file:
-                        code_snippets.append(f"File: {file['filename']}\n{file['patch']}")
-                
-                commit_data = {
-                    "sha": sha,
-                    "message": commit['commit']['message'],
-                    "author": commit['commit']['author']['name'],
-                    "date": commit['commit']['author']['date'],
-                    "files_changed": [f['filename'] for f in files],
-                    "code_changes": code_snippets[:3],  # Limit to 3 files for brevity
-                    "analysis": analysis,
-                    "stats": {
-                        "total_files_changed": len(files),
-                        "total_additions": sum(f.get('additions', 0) for f in files),
-                        "total_deletions": sum(f.get('deletions', 0) for f in files)
-                    }
-                }
-                analyzed_commits.append(commit_data)
-            
-            # Save results
-            if os.path.exists('app.json'):
-                os.remove('app.json')
-            
-            with open('app.json', 'w') as f:
-                json.dump(analyzed_commits, f, indent=2)
-            
-            print(f"\nDetailed analysis completed. Results saved to app.json")
-            print(f"Analyzed {len(analyzed_commits)} commits with full code changes and impact analysis")
+            git_source = LocalGitSource(local_path) if local_path else None
+            if git_source:
+                commits = git_source.iter_commits(limit)
+            else:
+                commits = self._iter_commits(session, owner, repo, limit)
+
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+            async def worker():
+                nonlocal exported, failed
+                while True:
+                    commit = await queue.get()
+                    if commit is None:
+                        return
+                    try:
+                        record = await self._export_commit(session, owner, repo, commit, git_source)
+                    except Exception as e:
+                        failed += 1
+                        logger.error(f"Failed to export commit {commit['sha'][:7]}: {str(e)}")
+                        continue
+                    out.write(json.dumps(record) + '\n')
+                    out.flush()
+                    checkpoint.record(commit['sha'])
+                    exported += 1
+                    if exported % 100 == 0:
+                        print(f"Exported {exported} commits ({exported / (time.monotonic() - started):.1f}/s)")
+
+            workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+            try:
+                async for commit in commits:
+                    if commit['sha'] not in checkpoint.completed:
+                        await queue.put(commit)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+                out.close()
+                checkpoint.close()
+
+        elapsed = time.monotonic() - started
+        print(f"\nDetailed analysis completed. Results saved to {output}")
+        print(f"Analyzed {exported} commits with full code changes and impact analysis "
+              f"in {elapsed:.1f}s ({exported / max(elapsed, 1e-9):.1f} commits/s)")
+        if resumed:
+            print(f"Reused {resumed} commits written by earlier runs")
+        if failed:
+            print(f"{failed} commits could not be exported; run the export again to retry them")
+        return output
 
 async def main():
     load_dotenv()
@@ -152,15 +317,24 @@ async def main():
     parser.add_argument('--owner', required=True, help='GitHub repository owner')
     parser.add_argument('--repo', required=True, help='GitHub repository name')
     parser.add_argument('--limit', type=int, default=50, help='Number of commits to analyze')
+    parser.add_argument('--local-path', help='Read history from a local clone or mirror instead of the GitHub API')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Commit details fetched at once')
+    parser.add_argument('--output', help='NDJSON file to write, one commit per line (default: <owner>_<repo>.ndjson)')
+    parser.add_argument('--restart', action='store_true', help='Discard the output and checkpoint of an earlier run')
     args = parser.parse_args()
 
     github_token = os.getenv('GITHUB_TOKEN')
-    if not github_token:
+    if not github_token and not args.local_path:
         print("Error: GITHUB_TOKEN not found in environment variables")
         return
 
-    analyzer = RepositoryAnalyzer(github_token)
-    await analyzer.analyze_repository(args.owner, args.repo, args.limit)
+    analyzer = RepositoryAnalyzer(github_token, concurrency=args.concurrency)
+    try:
+        await analyzer.analyze_repository(args.owner, args.repo, args.limit, args.local_path, args.output, args.restart)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+    finally:
+        shutdown_pool()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -1,9 +1,28 @@
 from trulens.apps.custom import instrument
 import json
 from dotenv import load_dotenv
+from itertools import islice
+import logging
 import os
+import time
 import snowflake.connector
 
+logger = logging.getLogger(__name__)
+
+def iter_records(json_file):
+    """Yields the records of a JSON array file or, one line at a time, of an NDJSON export."""
+    with open(json_file, 'r') as file:
+        first = file.read(1)
+        while first.isspace():
+            first = file.read(1)
+        file.seek(0)
+        if first == '[':
+            yield from json.load(file)
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
 @instrument
 def setup_databases(cur):
     """Set up required databases and tables."""
@@ -34,30 +53,96 @@ def setup_databases(cur):
         )
     """)
 
-@instrument
-def analyze_code_cleanliness(code_snippet, cur):
-    """Analyze code cleanliness using Mistral."""
-    prompt = (
-        "Please rate the cleanliness of the following code on a scale from 1 to 10, "
-        "where 1 is very messy and 10 is very clean. Provide only the numerical rating."
-        "The output should only be 1 number from 1 to 10 nothing else, no explanation.\n\n"
-        f"Code:\n{code_snippet}\n\n"
-        "Rating (1-10):"
+# Records staged and embedded per statement; override with UPSERT_BATCH_SIZE
+DEFAULT_BATCH_SIZE = int(os.getenv('UPSERT_BATCH_SIZE', '500'))
+
+STAGING_TABLE = "TestingData.Rag_operations.VecStaging"
+
+# Prompt for the cleanliness rating; the bulk insert puts each record's code between the two parts
+CLEANLINESS_PROMPT = (
+    "Please rate the cleanliness of the following code on a scale from 1 to 10, "
+    "where 1 is very messy and 10 is very clean. Provide only the numerical rating."
+    "The output should only be 1 number from 1 to 10 nothing else, no explanation.\n\n"
+    "Code:\n"
+)
+CLEANLINESS_PROMPT_END = "\n\nRating (1-10):"
+
+# Ratings that are not a number fall back to 5.0
+INSERT_BATCH_SQL = f"""
+    INSERT INTO TestingData.Rag_operations.VecTable (
+        author,
+        code,
+        explanation,
+        files_edited,
+        sha,
+        combined,
+        vector,
+        code_cleanliness_rating
     )
-    cur.execute("""
-        SELECT SNOWFLAKE.CORTEX.COMPLETE('mistral-large', %s)
-    """, (prompt,))
-    response = cur.fetchone()[0]
+    SELECT
+        author,
+        code,
+        explanation,
+        files_edited,
+        sha,
+        combined,
+        SNOWFLAKE.CORTEX.EMBED_TEXT_768('e5-base-v2', combined),
+        COALESCE(
+            TRY_TO_DOUBLE(TRIM(SNOWFLAKE.CORTEX.COMPLETE('mistral-large', %s || code || %s))),
+            5.0
+        )
+    FROM {STAGING_TABLE}
+"""
 
-    try:
-        rating = float(response.strip())
-    except ValueError:
-        rating = 5.0
-    return rating
+def staging_row(json_obj):
+    """Turns an exported commit into a row of the staging table."""
+    author = json_obj.get('author', '')
+    code = json_obj.get('code', '')
+    explanation = json_obj.get('explanation', '')
+    sha = json_obj.get('sha', '')
+    files_edited = json_obj.get('files edited', 0)
+
+    combined_text = (
+        f"The author is: {author}\n"
+        f"Here is the code: {code}\n"
+        f"Explanation:\n{explanation}\n"
+        f"SHA: {sha}\n"
+        f"Files edited: {files_edited}"
+    )
+    return (author, code, explanation, files_edited, sha, combined_text)
+
+def iter_batches(records, batch_size):
+    """Groups records into lists of at most batch_size."""
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+@instrument
+def upsert_batch(cur, rows):
+    """
+    Loads one batch of staging rows with a single multi-row insert, then
+    embeds, rates and inserts all of them into VecTable in one statement, so
+    the vectors never leave Snowflake.
+    """
+    cur.executemany(f"""
+        INSERT INTO {STAGING_TABLE} (author, code, explanation, files_edited, sha, combined)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, rows)
+    cur.execute(INSERT_BATCH_SQL, (CLEANLINESS_PROMPT, CLEANLINESS_PROMPT_END))
+    cur.execute(f"TRUNCATE TABLE {STAGING_TABLE}")
 
 @instrument
-def run_upsert(json_file, connection_params):
-    """Run upsert operation with the given JSON file."""
+def run_upsert(json_file, connection_params, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Run upsert operation with the given JSON file.
+
+    Records are sent batch_size at a time: each batch takes one round trip to
+    stage the raw rows and one to compute embeddings and ratings and insert
+    them server-side, instead of three round trips per record.
+    """
     conn = snowflake.connector.connect(**connection_params)
     cur = None
     try:
@@ -65,73 +150,33 @@ def run_upsert(json_file, connection_params):
         
         # Set up databases and tables
         setup_databases(cur)
+        cur.execute(f"""
+            CREATE OR REPLACE TEMPORARY TABLE {STAGING_TABLE} (
+                author STRING,
+                code STRING,
+                explanation STRING,
+                files_edited INTEGER,
+                sha STRING,
+                combined STRING
+            )
+        """)
 
         # Load and process JSON data
-        with open(json_file, 'r') as file:
-            json_array = json.load(file)
-
-        for index, json_obj in enumerate(json_array):
-            author = json_obj.get('author', '')
-            code = json_obj.get('code', '')
-            explanation = json_obj.get('explanation', '')
-            sha = json_obj.get('sha', '')
-            files_edited = json_obj.get('files edited', 0)
-            
-            combined_text = (
-                f"The author is: {author}\n"
-                f"Here is the code: {code}\n"
-                f"Explanation:\n{explanation}\n"
-                f"SHA: {sha}\n"
-                f"Files edited: {files_edited}"
-            )
-            
-            # Generate embedding
-            cur.execute("""
-                SELECT SNOWFLAKE.CORTEX.EMBED_TEXT_768('e5-base-v2', %s)
-            """, (combined_text,))
-            embedding_list = cur.fetchone()[0]
-            
-            embedding_str = ",".join(str(x) for x in embedding_list)
-            embedding_literal = f"[{embedding_str}]::VECTOR(FLOAT, 768)"
-
-            cleanliness_rating = analyze_code_cleanliness(code, cur)
-
-            insert_sql = """
-                INSERT INTO TestingData.Rag_operations.VecTable (
-                    author,
-                    code,
-                    explanation,
-                    files_edited,
-                    sha,
-                    combined,
-                    vector,
-                    code_cleanliness_rating
-                )
-                SELECT
-                    %s,
-                    %s,
-                    %s,
-                    %s,
-                    %s,
-                    %s,
-                    {0},
-                    %s
-                FROM (SELECT 1)
-            """.format(embedding_literal)
-            
-            cur.execute(insert_sql, (
-                author,
-                code,
-                explanation,
-                files_edited,
-                sha,
-                combined_text,
-                cleanliness_rating
-            ))
+        started = time.monotonic()
+        total = 0
+        for batch in iter_batches(map(staging_row, iter_records(json_file)), max(1, batch_size)):
+            batch_started = time.monotonic()
+            upsert_batch(cur, batch)
+            total += len(batch)
+            elapsed = time.monotonic() - batch_started
+            logger.info(f"Upserted batch of {len(batch)} records in {elapsed:.1f}s "
+                        f"({len(batch) / elapsed if elapsed else 0:.1f} rows/sec), {total} so far")
 
+        elapsed = time.monotonic() - started
+        logger.info(f"Upserted {total} records in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f} rows/sec)")
         return True
 
     finally:
         if cur:
             cur.close()
-        conn.close()
\ No newline at end of file
+        conn.close()
@@ -14,7 +14,7 @@ import logging
 sys.path.append(os.path.join(os.path.dirname(__file__), 'RAG'))
 
 # Import RAG components
-from repo_analyzer import RepositoryAnalyzer
+from repo_analyzer import ExportConflict, RepositoryAnalyzer
 from dashboard import CodeAnalyticsApp
 
 # Load environment variables
@@ -153,7 +153,12 @@ def analyze_repository(owner, repo):
         progress_text.text(f"Analyzing repository: {owner}/{repo}")
         progress_bar.progress(30)
         
-        asyncio.run(analyzer.analyze_repository(owner, repo))
+        try:
+            export_path = asyncio.run(analyzer.analyze_repository(owner, repo))
+        except ExportConflict as e:
+            # The app owns its exports; one it cannot resume is simply redone
+            logging.warning(f"Restarting export: {str(e)}")
+            export_path = asyncio.run(analyzer.analyze_repository(owner, repo, restart=True))
         
         # Step 3: RAG Setup
         progress_text.text("Setting up RAG system...")
@@ -170,7 +175,7 @@ def analyze_repository(owner, repo):
             "role": "ACCOUNTADMIN"
         }
         
-        app.process_json('app.json', connection_params)
+        app.process_json(export_path, connection_params)
         
         progress_text.text("Analysis complete! Ready for chat!")
         progress_bar.progress(100)
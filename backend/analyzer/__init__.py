@@ -1,16 +1,78 @@
-from .repo_analyzer import RepositoryAnalyzer
-from .graph_processor import GraphProcessor
-
-__all__ = ['RepositoryAnalyzer', 'GraphProcessor']
+import os
 
 # Version information
 __version__ = '1.0.0'
 
 # Module level constants
 DEFAULT_COMMIT_LIMIT = 50
-MAX_COMMIT_LIMIT = 100
+MAX_COMMIT_LIMIT = 50000
 DEFAULT_BRANCH = 'main'
 
+# GitHub caps list endpoints at 100 items per page
+GITHUB_PAGE_SIZE = 100
+
+# Number of commits whose details may be in flight at once
+MAX_PENDING_COMMITS = 200
+
+# Request scheduling: in-flight requests per host and retries per request
+MAX_REQUESTS_PER_HOST = 8
+MAX_REQUEST_RETRIES = 4
+
+# Shared HTTP connection pool (see http_client): total and per-host connections,
+# how long resolved addresses and idle connections are kept, and timeouts in seconds
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 100))
+HTTP_POOL_SIZE_PER_HOST = int(os.getenv('HTTP_POOL_SIZE_PER_HOST', 32))
+HTTP_DNS_CACHE_TTL = 300
+HTTP_KEEPALIVE_TIMEOUT = 30
+HTTP_CONNECT_TIMEOUT = 10
+HTTP_READ_TIMEOUT = 120
+
+# LLM change summaries: commits are packed into batched requests of at most
+# LLM_BATCH_SIZE commits and about LLM_BATCH_TOKEN_BUDGET prompt tokens; a
+# partial batch is sent LLM_BATCH_MAX_WAIT seconds after its first commit joined
+LLM_MODEL = os.getenv('LLM_MODEL', 'gpt-4')
+LLM_BATCH_SIZE = int(os.getenv('LLM_BATCH_SIZE', 8))
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv('LLM_BATCH_TOKEN_BUDGET', 6000))
+LLM_BATCH_MAX_WAIT = 0.2
+LLM_SUMMARY_TOKENS = 100
+
+# Patch feature extraction: commits with more patch text than PATCH_POOL_THRESHOLD
+# bytes are processed in a pool of PATCH_POOL_WORKERS processes, off the event loop
+PATCH_POOL_THRESHOLD = 256 * 1024
+PATCH_POOL_WORKERS = int(os.getenv('PATCH_POOL_WORKERS', min(4, os.cpu_count() or 1)))
+PATCH_TOP_CHANGES = 5
+
+# On-disk cache of commit detail payloads, shared by the backend and the RAG exporter
+COMMIT_CACHE_PATH = os.getenv(
+    'COMMIT_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'commits.db')
+)
+COMMIT_CACHE_MAX_BYTES = int(os.getenv('COMMIT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# On-disk cache of raw commit diffs with a per-file byte-offset index
+DIFF_CACHE_PATH = os.getenv(
+    'DIFF_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'diffs.db')
+)
+DIFF_CACHE_MAX_BYTES = int(os.getenv('DIFF_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# On-disk cache of LLM change summaries keyed by a hash of the files and patches
+# summarized, so identical changes in forks, cherry-picks and other repos are summarized once
+ANALYSIS_CACHE_PATH = os.getenv(
+    'ANALYSIS_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'analyses.db')
+)
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv('ANALYSIS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Directory of local mirrors, laid out as <root>/<owner>/<repo>[.git]
+GIT_MIRROR_ROOT = os.getenv('GIT_MIRROR_ROOT')
+
+from .repo_analyzer import RepositoryAnalyzer
+from .graph_processor import GraphProcessor
+from .commit_graph import CommitGraph
+
+__all__ = ['RepositoryAnalyzer', 'GraphProcessor', 'CommitGraph']
+
 # Configure logging
 import logging
 logger = logging.getLogger(__name__)
@@ -25,4 +87,4 @@ formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(messag
 handler.setFormatter(formatter)
 
 # Add handler to logger
-logger.addHandler(handler)
\ No newline at end of file
+logger.addHandler(handler)
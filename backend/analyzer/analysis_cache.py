@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from . import ANALYSIS_CACHE_MAX_BYTES, ANALYSIS_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Line numbers of hunk headers depend on where a change was applied, not on the change itself
+HUNK_RANGES = re.compile(r'^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@', re.MULTILINE)
+
+
+def _normalize_patch(patch: str) -> str:
+    patch = patch.replace('\r\n', '\n').rstrip('\n')
+    return HUNK_RANGES.sub('@@', patch)
+
+
+def analysis_key(files: List[Dict], model: str) -> str:
+    """
+    Hashes what an LLM summary of a change depends on: the model and, per file
+    in path order, its name and patch with hunk line numbers left out. Commit
+    SHAs, repositories and file order do not take part, so the same change
+    committed twice gets the same key.
+    """
+    digest = hashlib.sha256(model.encode('utf-8'))
+    for file in sorted(files, key=lambda f: f['filename']):
+        for part in (file['filename'], _normalize_patch(file.get('patch') or '')):
+            encoded = part.encode('utf-8')
+            # Length-prefixed so that no two file lists hash the same input
+            digest.update(len(encoded).to_bytes(8, 'big'))
+            digest.update(encoded)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    On-disk cache of LLM change summaries keyed by analysis_key.
+
+    A summary only depends on the change it describes, so entries never go
+    stale and are shared by every repository (and process) using the same
+    file; they are evicted, least recently used first, once the stored
+    summaries exceed max_bytes. Each entry counts how often it was reused;
+    hit and miss counters since startup are per process.
+
+    Methods block on SQLite; async callers run them in a worker thread.
+    """
+
+    def __init__(self, path: str = ANALYSIS_CACHE_PATH, max_bytes: int = ANALYSIS_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_accessed ON analyses (accessed)")
+        self._conn.commit()
+        self._size = self._stored_bytes()
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached summary, or None if this change has not been summarized"""
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.counters['misses'] += 1
+                return None
+            self._conn.execute(
+                "UPDATE analyses SET accessed = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.counters['hits'] += 1
+        return row[0]
+
+    def put(self, key: str, summary: str):
+        """Stores a summary, evicting old entries if the cache is full"""
+        size = len(summary.encode('utf-8'))
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM analyses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, summary, size, hits, accessed) VALUES (?, ?, ?, 0, ?)",
+                (key, summary, size, time.time())
+            )
+            self._conn.commit()
+            self._size += size - (replaced[0] if replaced else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Deletes least recently used summaries until the cache is back under 90% of max_bytes"""
+        # Other processes may have written to the same file, so start from the real total
+        self._size = self._stored_bytes()
+        target = self.max_bytes * 0.9
+        if self._size <= target:
+            return
+
+        expired = []
+        for key, size in self._conn.execute("SELECT key, size FROM analyses ORDER BY accessed").fetchall():
+            if self._size <= target:
+                break
+            expired.append((key,))
+            self._size -= size
+
+        self._conn.executemany("DELETE FROM analyses WHERE key = ?", expired)
+        self._conn.commit()
+        self.counters['evictions'] += len(expired)
+        logger.info(f"Evicted {len(expired)} summaries from cache at {self.path}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size, reused = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM analyses"
+            ).fetchone()
+            lookups = self.counters['hits'] + self.counters['misses']
+            return {
+                **self.counters,
+                'hit_rate': self.counters['hits'] / lookups if lookups else 0,
+                'entries': entries,
+                'bytes': size,
+                'max_bytes': self.max_bytes,
+                'stored_hits': reused
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache: Optional[AnalysisCache] = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Returns the process-wide analysis cache, opening it on first use"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = AnalysisCache()
+    return _shared_cache
@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+from . import COMMIT_CACHE_MAX_BYTES, COMMIT_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class CommitCache:
+    """
+    On-disk cache of GitHub commit detail payloads keyed by (owner, repo, sha).
+
+    Commits are immutable, so entries never go stale; they are only evicted,
+    least recently used first, once the stored payloads exceed max_bytes.
+    Payloads are stored as zlib-compressed JSON in a SQLite database, which
+    also makes the cache safe to share between processes.
+
+    Methods block on SQLite and zlib; async callers run them in a worker
+    thread (asyncio.to_thread) so that they do not stall the event loop.
+
+    The cache also keeps the ETag/Last-Modified validators of commit-list
+    requests together with the result built from them, so an unchanged
+    repository can be answered from a 304 response.
+    """
+
+    def __init__(self, path: str = COMMIT_CACHE_PATH, max_bytes: int = COMMIT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS commits (
+                owner TEXT NOT NULL,
+                repo TEXT NOT NULL,
+                sha TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (owner, repo, sha)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS commits_accessed ON commits (accessed)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS list_results (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self._size = self._stored_bytes()
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute(
+            "SELECT (SELECT COALESCE(SUM(size), 0) FROM commits) + (SELECT COALESCE(SUM(size), 0) FROM list_results)"
+        ).fetchone()[0]
+
+    def get(self, owner: str, repo: str, sha: str) -> Optional[Dict]:
+        """Returns the cached commit detail, or None if it has not been seen"""
+        key = (owner.lower(), repo.lower(), sha)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM commits WHERE owner = ? AND repo = ? AND sha = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE commits SET accessed = ? WHERE owner = ? AND repo = ? AND sha = ?",
+                (time.time(), *key)
+            )
+            self._conn.commit()
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, owner: str, repo: str, sha: str, detail: Dict):
+        """Stores a commit detail payload, evicting old entries if the cache is full"""
+        payload = zlib.compress(json.dumps(detail).encode('utf-8'))
+        key = (owner.lower(), repo.lower(), sha)
+        with self._lock:
+            replaced = self._conn.execute(
+                "SELECT size FROM commits WHERE owner = ? AND repo = ? AND sha = ?", key
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO commits (owner, repo, sha, payload, size, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, payload, len(payload), time.time())
+            )
+            self._conn.commit()
+            self._size += len(payload) - (replaced[0] if replaced else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def get_validators(self, key: str) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """Returns the (etag, last_modified) pair stored for a commit-list result"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM list_results WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def get_result(self, key: str) -> Optional[Dict]:
+        """Returns the result previously built from a commit-list response"""
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM list_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE list_results SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(zlib.decompress(row[0]))
+
+    def put_result(self, key: str, etag: Optional[str], last_modified: Optional[str], result: Dict):
+        """Stores the result built from a commit-list response along with its validators"""
+        payload = zlib.compress(json.dumps(result).encode('utf-8'))
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM list_results WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO list_results (key, etag, last_modified, payload, size, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, payload, len(payload), time.time())
+            )
+            self._conn.commit()
+            self._size += len(payload) - (replaced[0] if replaced else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Deletes least recently used entries until the cache is back under 90% of max_bytes"""
+        # Other processes may have written to the same file, so start from the real total
+        self._size = self._stored_bytes()
+        target = self.max_bytes * 0.9
+        if self._size <= target:
+            return
+
+        expired_commits = []
+        expired_results = []
+        for table, first, repo, sha, size, _ in self._conn.execute("""
+            SELECT 'commits', owner, repo, sha, size, accessed FROM commits
+            UNION ALL
+            SELECT 'list_results', key, NULL, NULL, size, accessed FROM list_results
+            ORDER BY accessed
+        """).fetchall():
+            if self._size <= target:
+                break
+            if table == 'commits':
+                expired_commits.append((first, repo, sha))
+            else:
+                expired_results.append((first,))
+            self._size -= size
+
+        self._conn.executemany("DELETE FROM commits WHERE owner = ? AND repo = ? AND sha = ?", expired_commits)
+        self._conn.executemany("DELETE FROM list_results WHERE key = ?", expired_results)
+        self._conn.commit()
+        logger.info(f"Evicted {len(expired_commits)} commits and {len(expired_results)} results from cache at {self.path}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache: Optional[CommitCache] = None
+
+
+def get_commit_cache() -> CommitCache:
+    """Returns the process-wide commit cache, opening it on first use"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = CommitCache()
+    return _shared_cache
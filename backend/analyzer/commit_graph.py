@@ -0,0 +1,220 @@
+import networkx as nx
+import numpy as np
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+
+def _as_array(packed: List[bytes]) -> np.ndarray:
+    """Stores packed object ids in a fixed-width bytes array"""
+    return np.array(packed, dtype=f'S{max((len(p) for p in packed), default=1) or 1}')
+
+
+class CommitGraph:
+    """
+    Compact, array-backed commit DAG.
+
+    Commits are identified by ordinals 0..n-1, assigned in SHA order so that a
+    SHA can be looked up with a binary search over the packed object ids.
+    Parent and child links are stored as CSR int32 arrays, and every commit gets
+    a generation number (1 for commits without parents in the graph, otherwise
+    one more than its highest parent), which gives a topological order for free.
+    A commit costs a few tens of bytes, against kilobytes for a NetworkX node.
+
+    Parents outside the set of commits (e.g. beyond the analysed window) are dropped.
+    """
+
+    def __init__(self, oids: np.ndarray, parent_offsets: np.ndarray, parent_index: np.ndarray,
+                 child_offsets: np.ndarray, child_index: np.ndarray, generation: np.ndarray, hex_ids: bool):
+        self.oids = oids
+        self.parent_offsets = parent_offsets
+        self.parent_index = parent_index
+        self.child_offsets = child_offsets
+        self.child_index = child_index
+        self.generation = generation
+        self._hex_ids = hex_ids
+
+    @classmethod
+    def from_commits(cls, commits: Iterable[Tuple[str, Sequence[str]]]) -> 'CommitGraph':
+        """
+        Builds the graph from (sha, parent_shas) pairs in any order, in linear passes
+        plus numpy sorts.
+
+        Raises:
+            ValueError: If a SHA appears more than once
+        """
+        shas: List[str] = []
+        parent_counts: List[int] = []
+        parent_shas: List[str] = []
+        for sha, parents in commits:
+            shas.append(sha)
+            parent_counts.append(len(parents))
+            parent_shas.extend(parents)
+
+        oids, hex_ids = cls._pack(shas)
+        parent_oids, _ = cls._pack(parent_shas, hex_ids)
+        n = len(oids)
+
+        # Ordinals follow SHA order; rank maps arrival position to ordinal
+        arrival = np.argsort(oids, kind='stable')
+        oids = oids[arrival]
+        if n > 1 and np.any(oids[1:] == oids[:-1]):
+            raise ValueError('Duplicate commit SHA in input')
+        rank = np.empty(n, dtype=np.int32)
+        rank[arrival] = np.arange(n, dtype=np.int32)
+
+        # Resolve parents by binary search, dropping those outside the graph
+        edge_child = np.repeat(rank, np.asarray(parent_counts, dtype=np.int64))
+        edge_parent = np.searchsorted(oids, parent_oids).astype(np.int32) if n else np.zeros(0, dtype=np.int32)
+        found = edge_parent < n
+        found[found] = oids[edge_parent[found]] == parent_oids[found]
+        edge_child, edge_parent = edge_child[found], edge_parent[found]
+
+        parent_offsets, parent_index = cls._csr(edge_child, edge_parent, n)
+        child_offsets, child_index = cls._csr(edge_parent, edge_child, n)
+        generation = cls._generations(parent_offsets, child_offsets, child_index)
+        return cls(oids, parent_offsets, parent_index, child_offsets, child_index, generation, hex_ids)
+
+    @classmethod
+    def from_networkx(cls, graph: nx.DiGraph) -> 'CommitGraph':
+        """Builds the graph from a NetworkX DiGraph whose edges point from parent to child"""
+        return cls.from_commits((node, list(graph.predecessors(node))) for node in graph.nodes())
+
+    @staticmethod
+    def _pack(shas: List[str], hex_ids: Optional[bool] = None) -> Tuple[np.ndarray, bool]:
+        """Packs SHAs into a fixed-width bytes array, as raw object ids when they are hex"""
+        if hex_ids is None:
+            try:
+                return _as_array([bytes.fromhex(sha) for sha in shas]), True
+            except ValueError:
+                hex_ids = False
+
+        def pack(sha: str) -> bytes:
+            if not hex_ids:
+                return sha.encode('utf-8')
+            try:
+                return bytes.fromhex(sha)
+            except ValueError:
+                # A non-hex parent can never match a hex commit
+                return b''
+
+        return _as_array([pack(sha) for sha in shas]), hex_ids
+
+    @staticmethod
+    def _csr(rows: np.ndarray, cols: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Groups cols by rows into CSR offsets and indices, keeping input order within a row"""
+        order = np.argsort(rows, kind='stable')
+        offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+        return offsets, cols[order].astype(np.int32)
+
+    @staticmethod
+    def _generations(parent_offsets: np.ndarray, child_offsets: np.ndarray, child_index: np.ndarray) -> np.ndarray:
+        """Assigns generation numbers with a single Kahn pass over the DAG"""
+        n = len(parent_offsets) - 1
+        pending = np.diff(parent_offsets).tolist()
+        child_starts = child_offsets.tolist()
+        children = child_index.tolist()
+        generation = [1] * n
+
+        queue = [i for i in range(n) if pending[i] == 0]
+        for node in queue:
+            next_generation = generation[node] + 1
+            for child in children[child_starts[node]:child_starts[node + 1]]:
+                if generation[child] < next_generation:
+                    generation[child] = next_generation
+                pending[child] -= 1
+                if pending[child] == 0:
+                    queue.append(child)
+
+        if len(queue) != n:
+            raise ValueError('Commit graph contains a cycle')
+        return np.asarray(generation, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.oids)
+
+    @property
+    def nbytes(self) -> int:
+        """Total memory held by the graph arrays"""
+        return sum(a.nbytes for a in (self.oids, self.parent_offsets, self.parent_index,
+                                      self.child_offsets, self.child_index, self.generation))
+
+    def sha(self, ordinal: int) -> str:
+        oid = self.oids[ordinal]
+        if self._hex_ids:
+            # numpy drops trailing NUL bytes from fixed-width bytes values
+            return oid.ljust(self.oids.itemsize, b'\0').hex()
+        return oid.decode('utf-8')
+
+    def shas(self) -> List[str]:
+        return [self.sha(i) for i in range(len(self))]
+
+    def index(self, sha: str) -> int:
+        """Returns the ordinal of a SHA
+
+        Raises:
+            KeyError: If the SHA is not in the graph
+        """
+        try:
+            key = bytes.fromhex(sha) if self._hex_ids else sha.encode('utf-8')
+        except ValueError:
+            raise KeyError(sha)
+        # Normalize the key the same way numpy stores it (trailing NUL bytes dropped)
+        key = np.array(key, dtype=self.oids.dtype)[()]
+        position = int(np.searchsorted(self.oids, key))
+        if position == len(self.oids) or self.oids[position] != key:
+            raise KeyError(sha)
+        return position
+
+    def indices(self, shas: List[str]) -> np.ndarray:
+        """Returns the ordinals of many SHAs at once
+
+        Raises:
+            KeyError: If any SHA is not in the graph
+        """
+        keys, _ = self._pack(shas, self._hex_ids)
+        keys = keys.astype(self.oids.dtype)
+        positions = np.searchsorted(self.oids, keys)
+        found = positions < len(self.oids)
+        found[found] = self.oids[positions[found]] == keys[found]
+        if not found.all():
+            raise KeyError(shas[int(np.argmin(found))])
+        return positions.astype(np.int32)
+
+    def __contains__(self, sha: str) -> bool:
+        try:
+            self.index(sha)
+            return True
+        except KeyError:
+            return False
+
+    def parents(self, ordinal: int) -> np.ndarray:
+        return self.parent_index[self.parent_offsets[ordinal]:self.parent_offsets[ordinal + 1]]
+
+    def children(self, ordinal: int) -> np.ndarray:
+        return self.child_index[self.child_offsets[ordinal]:self.child_offsets[ordinal + 1]]
+
+    def in_degree(self) -> np.ndarray:
+        return np.diff(self.parent_offsets)
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.child_offsets)
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (parent, child) ordinal arrays, one entry per edge"""
+        children = np.repeat(np.arange(len(self), dtype=np.int32), self.in_degree())
+        return self.parent_index, children
+
+    def topological_order(self) -> np.ndarray:
+        """Ordinals sorted so that every parent comes before its children"""
+        return np.argsort(self.generation, kind='stable')
+
+    def to_networkx(self, attributes: Optional[Mapping[str, Dict]] = None) -> nx.DiGraph:
+        """Builds an equivalent NetworkX DiGraph, with node attributes looked up by SHA"""
+        graph = nx.DiGraph()
+        shas = self.shas()
+        for ordinal in self.topological_order().tolist():
+            sha = shas[ordinal]
+            graph.add_node(sha, **(attributes.get(sha, {}) if attributes else {}))
+        parents, children = self.edges()
+        graph.add_edges_from((shas[p], shas[c]) for p, c in zip(parents.tolist(), children.tolist()))
+        return graph
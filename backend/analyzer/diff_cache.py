@@ -0,0 +1,188 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from . import DIFF_CACHE_MAX_BYTES, DIFF_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Diffs are stored in rows of this many bytes, so a read only loads the rows it overlaps
+CHUNK_BYTES = 64 * 1024
+
+
+class DiffCache:
+    """
+    On-disk cache of raw commit diffs keyed by (owner, repo, sha).
+
+    Each diff is stored once, uncompressed and split into CHUNK_BYTES rows,
+    together with an index of the byte range every file occupies in it. Reading
+    a range of one file's diff only loads the chunks that overlap it, so
+    streaming a diff in pieces costs I/O in proportion to its size, however
+    large the commit is. Like commit details, diffs of a SHA never change;
+    entries are only evicted, least recently used first, once the stored diffs
+    exceed max_bytes.
+
+    Methods block on SQLite; async callers run them in a worker thread.
+    """
+
+    def __init__(self, path: str = DIFF_CACHE_PATH, max_bytes: int = DIFF_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(diffs)")}
+        if 'payload' in columns:
+            # Diffs cached whole in one blob by an earlier version; they are cheap to fetch again
+            logger.info(f"Dropping diffs cached in the old layout at {path}")
+            self._conn.execute("DROP TABLE diffs")
+            self._conn.execute("DROP TABLE IF EXISTS diff_files")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS diffs (
+                owner TEXT NOT NULL,
+                repo TEXT NOT NULL,
+                sha TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (owner, repo, sha)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS diffs_accessed ON diffs (accessed)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS diff_chunks (
+                owner TEXT NOT NULL,
+                repo TEXT NOT NULL,
+                sha TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (owner, repo, sha, seq)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS diff_files (
+                owner TEXT NOT NULL,
+                repo TEXT NOT NULL,
+                sha TEXT NOT NULL,
+                path TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                end INTEGER NOT NULL,
+                PRIMARY KEY (owner, repo, sha, path)
+            )
+        """)
+        self._conn.commit()
+        self._size = self._stored_bytes()
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM diffs").fetchone()[0]
+
+    def get_index(self, owner: str, repo: str, sha: str) -> Optional[Dict[str, Tuple[int, int]]]:
+        """Returns path -> (start, end) byte offsets for a cached diff, or None if it is not cached"""
+        key = (owner.lower(), repo.lower(), sha)
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE diffs SET accessed = ? WHERE owner = ? AND repo = ? AND sha = ?", (time.time(), *key)
+            ).rowcount
+            if not updated:
+                return None
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT path, start, end FROM diff_files WHERE owner = ? AND repo = ? AND sha = ?", key
+            ).fetchall()
+        return {path: (start, end) for path, start, end in rows}
+
+    def read(self, owner: str, repo: str, sha: str, start: int, length: int) -> bytes:
+        """Reads up to length bytes of a cached diff starting at byte offset start"""
+        key = (owner.lower(), repo.lower(), sha)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size FROM diffs WHERE owner = ? AND repo = ? AND sha = ?", key
+            ).fetchone()
+            if row is None:
+                raise KeyError(f'{owner}/{repo}@{sha}')
+            end = min(row[0], start + length)
+            if start >= end:
+                return b''
+            first = start // CHUNK_BYTES
+            chunks = self._conn.execute(
+                "SELECT data FROM diff_chunks WHERE owner = ? AND repo = ? AND sha = ? AND seq BETWEEN ? AND ? "
+                "ORDER BY seq",
+                (*key, first, (end - 1) // CHUNK_BYTES)
+            ).fetchall()
+        data = b''.join(chunk for chunk, in chunks)
+        offset = start - first * CHUNK_BYTES
+        return data[offset:offset + end - start]
+
+    def put(self, owner: str, repo: str, sha: str, diff: bytes, index: Dict[str, Tuple[int, int]]):
+        """Stores a diff with its file index, evicting old entries if the cache is full"""
+        key = (owner.lower(), repo.lower(), sha)
+        view = memoryview(diff)
+        chunks = [
+            (*key, seq, bytes(view[offset:offset + CHUNK_BYTES]))
+            for seq, offset in enumerate(range(0, len(diff), CHUNK_BYTES))
+        ]
+        with self._lock:
+            replaced = self._conn.execute(
+                "SELECT size FROM diffs WHERE owner = ? AND repo = ? AND sha = ?", key
+            ).fetchone()
+            self._conn.execute("DELETE FROM diff_files WHERE owner = ? AND repo = ? AND sha = ?", key)
+            self._conn.execute("DELETE FROM diff_chunks WHERE owner = ? AND repo = ? AND sha = ?", key)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO diffs (owner, repo, sha, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                (*key, len(diff), time.time())
+            )
+            self._conn.executemany(
+                "INSERT INTO diff_chunks (owner, repo, sha, seq, data) VALUES (?, ?, ?, ?, ?)", chunks
+            )
+            self._conn.executemany(
+                "INSERT INTO diff_files (owner, repo, sha, path, start, end) VALUES (?, ?, ?, ?, ?, ?)",
+                [(*key, path, start, end) for path, (start, end) in index.items()]
+            )
+            self._conn.commit()
+            self._size += len(diff) - (replaced[0] if replaced else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Deletes least recently used diffs until the cache is back under 90% of max_bytes"""
+        # Other processes may have written to the same file, so start from the real total
+        self._size = self._stored_bytes()
+        target = self.max_bytes * 0.9
+        if self._size <= target:
+            return
+
+        expired = []
+        for owner, repo, sha, size in self._conn.execute(
+            "SELECT owner, repo, sha, size FROM diffs ORDER BY accessed"
+        ).fetchall():
+            if self._size <= target:
+                break
+            expired.append((owner, repo, sha))
+            self._size -= size
+
+        self._conn.executemany("DELETE FROM diffs WHERE owner = ? AND repo = ? AND sha = ?", expired)
+        self._conn.executemany("DELETE FROM diff_chunks WHERE owner = ? AND repo = ? AND sha = ?", expired)
+        self._conn.executemany("DELETE FROM diff_files WHERE owner = ? AND repo = ? AND sha = ?", expired)
+        self._conn.commit()
+        logger.info(f"Evicted {len(expired)} diffs from cache at {self.path}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache: Optional[DiffCache] = None
+
+
+def get_diff_cache() -> DiffCache:
+    """Returns the process-wide diff cache, opening it on first use"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = DiffCache()
+    return _shared_cache
@@ -0,0 +1,334 @@
+import codecs
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+HUNK_HEADER = re.compile(rb'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+PLUS, MINUS, SPACE, BACKSLASH = ord('+'), ord('-'), ord(' '), ord('\\')
+
+
+@dataclass
+class Hunk:
+    """One @@ hunk; start/end are byte offsets of its first and past its last line"""
+    start: int
+    end: int
+    old_start: int
+    old_lines: int
+    new_start: int
+    new_lines: int
+    additions: int = 0
+    deletions: int = 0
+
+
+@dataclass
+class FileEntry:
+    """
+    One file's section of a diff. start/end delimit the section from its
+    'diff --git' line to the end of its last line (without the final newline).
+    """
+    start: int
+    end: int = 0
+    old_path: Optional[str] = None
+    new_path: Optional[str] = None
+    status: Optional[str] = None
+    binary: bool = False
+    mode_changed: bool = False
+    hunks: List[Hunk] = field(default_factory=list)
+
+    @property
+    def path(self) -> Optional[str]:
+        return self.new_path or self.old_path
+
+    @property
+    def additions(self) -> int:
+        return sum(h.additions for h in self.hunks)
+
+    @property
+    def deletions(self) -> int:
+        return sum(h.deletions for h in self.hunks)
+
+    @property
+    def patch_start(self) -> int:
+        """Offset of the first hunk, i.e. where the GitHub-style 'patch' begins"""
+        return self.hunks[0].start if self.hunks else self.end
+
+    def slice(self, source: Buffer) -> memoryview:
+        """The section's bytes, as a view into the diff it was parsed from"""
+        return memoryview(source)[self.start:self.end]
+
+    def patch(self, source: Buffer) -> memoryview:
+        """The hunks only, as a view into the diff it was parsed from"""
+        return memoryview(source)[self.patch_start:self.end]
+
+
+@dataclass
+class DiffIndex:
+    """Files of a parsed diff in order, with lookup by path"""
+    files: List[FileEntry]
+    size: int
+
+    def __post_init__(self):
+        self._by_path: Dict[str, FileEntry] = {}
+        for entry in self.files:
+            for path in (entry.old_path, entry.new_path):
+                if path is not None:
+                    self._by_path.setdefault(path, entry)
+        # A file's current name wins over another file's previous name
+        for entry in self.files:
+            if entry.new_path is not None:
+                self._by_path[entry.new_path] = entry
+
+    def get(self, path: str) -> Optional[FileEntry]:
+        return self._by_path.get(path)
+
+    def spans(self) -> Dict[str, Tuple[int, int]]:
+        """Maps every path (current and previous names) to its section's byte range"""
+        return {path: (entry.start, entry.end) for path, entry in self._by_path.items()}
+
+    def __iter__(self) -> Iterator[FileEntry]:
+        return iter(self.files)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+
+def _unquote(raw: bytes) -> str:
+    """Decodes a path as git prints it: C-quoted (with octal UTF-8 escapes) when it has special characters"""
+    if len(raw) >= 2 and raw[:1] == b'"' and raw[-1:] == b'"':
+        raw = codecs.escape_decode(raw[1:-1])[0]
+    return raw.decode('utf-8', errors='replace')
+
+
+def _strip_prefix(path: str, prefix: str) -> str:
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+
+def _marker_path(raw: bytes, prefix: str) -> Optional[str]:
+    """Path from a '--- a/x' or '+++ b/x' line, None for /dev/null"""
+    raw = raw.rstrip(b'\t')
+    if raw == b'/dev/null':
+        return None
+    return _strip_prefix(_unquote(raw), prefix)
+
+
+def _header_paths(rest: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Paths from the 'a/<old> b/<new>' part of a 'diff --git' line. That line is
+    ambiguous when a path contains ' b/', so it is only relied on for sections
+    with no ---/+++ or rename lines, where both paths are the same.
+    """
+    if rest[:1] == b'"':
+        # "a/<old>" followed by b/<new>, either of them quoted
+        close = rest.find(b'" ', 1)
+        if close != -1:
+            old, new = rest[:close + 1], rest[close + 2:]
+            return _strip_prefix(_unquote(old), 'a/'), _strip_prefix(_unquote(new), 'b/')
+    if rest.endswith(b'"'):
+        open_quote = rest.rfind(b' "')
+        if open_quote != -1:
+            old, new = rest[:open_quote], rest[open_quote + 1:]
+            return _strip_prefix(_unquote(old), 'a/'), _strip_prefix(_unquote(new), 'b/')
+
+    # Same path on both sides: 'a/P b/P' splits exactly in the middle
+    if len(rest) % 2 == 1:
+        half = len(rest) // 2
+        old, new = rest[:half], rest[half + 1:]
+        if old[:2] == b'a/' and new[:2] == b'b/' and old[2:] == new[2:] and rest[half:half + 1] == b' ':
+            path = _unquote(old[2:])
+            return path, path
+
+    old, _, new = rest.partition(b' b/')
+    return _strip_prefix(_unquote(old), 'a/'), _unquote(new)
+
+
+class DiffParser:
+    """
+    Incremental unified-diff parser working on bytes.
+
+    Input can be fed in chunks of any size; only the unfinished last line is
+    buffered between chunks, and lines are classified by their first byte
+    without being copied, so a diff of any size is indexed in memory
+    proportional to its number of files and hunks. The result records byte
+    offsets only; file and hunk contents are materialized lazily as views into
+    the original diff (see FileEntry.slice and FileEntry.patch).
+
+    Hunk bodies are delimited by the line counts in their @@ headers, so
+    changed lines that look like headers ('--- x', '+++ y', 'diff --git') are
+    counted correctly. Input that starts with a hunk rather than a
+    'diff --git' line (such as the 'patch' field of the GitHub API) is parsed
+    as a single file without paths.
+    """
+
+    def __init__(self):
+        self.files: List[FileEntry] = []
+        self._buffer = bytearray()
+        self._offset = 0
+        self._file: Optional[FileEntry] = None
+        self._hunk: Optional[Hunk] = None
+        self._old_left = 0
+        self._new_left = 0
+        self._last_line_end = 0
+
+    def feed(self, data: Buffer):
+        """Parses every complete line of data, keeping the rest for the next call"""
+        if self._buffer:
+            self._buffer += data
+            consumed = self._scan(self._buffer, self._offset)
+            del self._buffer[:consumed]
+        else:
+            if isinstance(data, memoryview):
+                # memoryview has no find(); scan the object it views when it views all of it
+                whole = isinstance(data.obj, (bytes, bytearray)) and data.nbytes == len(data.obj)
+                data = data.obj if whole else data.tobytes()
+            consumed = self._scan(data, self._offset)
+            self._buffer += data[consumed:]
+        self._offset += consumed
+
+    def close(self) -> DiffIndex:
+        """Parses any unterminated last line and returns the index"""
+        if self._buffer:
+            self._line(self._buffer, 0, len(self._buffer), self._offset)
+            self._last_line_end = self._offset + len(self._buffer)
+            self._offset += len(self._buffer)
+            self._buffer = bytearray()
+        self._finish_file()
+        return DiffIndex(self.files, self._offset)
+
+    def _scan(self, buffer: Buffer, base: int) -> int:
+        start = 0
+        find = buffer.find
+        while True:
+            newline = find(b'\n', start)
+            if newline == -1:
+                return start
+            self._line(buffer, start, newline, base)
+            self._last_line_end = base + newline
+            start = newline + 1
+
+    def _line(self, buffer: Buffer, start: int, end: int, base: int):
+        """Handles the line buffer[start:end] (without its newline), which begins at base + start"""
+        if self._hunk is not None:
+            first = buffer[start] if end > start else SPACE
+            if first == SPACE:
+                self._old_left -= 1
+                self._new_left -= 1
+            elif first == MINUS:
+                self._old_left -= 1
+                self._hunk.deletions += 1
+            elif first == PLUS:
+                self._new_left -= 1
+                self._hunk.additions += 1
+            elif first != BACKSLASH:
+                # Truncated hunk: close it and read the line as a header
+                self._close_hunk()
+                return self._header(bytes(buffer[start:end]), base + start)
+            self._hunk.end = base + end
+            if self._old_left <= 0 and self._new_left <= 0:
+                self._close_hunk()
+            return
+
+        if end > start and buffer[start] == BACKSLASH and self._file is not None and self._file.hunks:
+            # '\ No newline at end of file' after a hunk's last line
+            self._file.hunks[-1].end = base + end
+            return
+        self._header(bytes(buffer[start:end]), base + start)
+
+    def _close_hunk(self):
+        self._file.hunks.append(self._hunk)
+        self._hunk = None
+
+    def _header(self, line: bytes, offset: int):
+        if line.startswith(b'diff --git '):
+            self._finish_file()
+            # Provisional paths; ---/+++ and rename/copy lines override them
+            self._file = FileEntry(start=offset)
+            self._file.old_path, self._file.new_path = _header_paths(line[len(b'diff --git '):])
+            return
+
+        match = HUNK_HEADER.match(line) if line.startswith(b'@@') else None
+        if match:
+            if self._file is None:
+                self._file = FileEntry(start=offset)
+            old_lines = int(match.group(2)) if match.group(2) is not None else 1
+            new_lines = int(match.group(4)) if match.group(4) is not None else 1
+            self._hunk = Hunk(offset, offset + len(line), int(match.group(1)), old_lines,
+                              int(match.group(3)), new_lines)
+            self._old_left, self._new_left = old_lines, new_lines
+            if old_lines == 0 and new_lines == 0:
+                self._close_hunk()
+            return
+
+        entry = self._file
+        if entry is None or entry.hunks:
+            return
+        if line.startswith(b'--- '):
+            entry.old_path = _marker_path(line[4:], 'a/')
+        elif line.startswith(b'+++ '):
+            entry.new_path = _marker_path(line[4:], 'b/')
+        elif line.startswith(b'rename from '):
+            entry.old_path, entry.status = _unquote(line[len(b'rename from '):]), 'renamed'
+        elif line.startswith(b'rename to '):
+            entry.new_path, entry.status = _unquote(line[len(b'rename to '):]), 'renamed'
+        elif line.startswith(b'copy from '):
+            entry.old_path, entry.status = _unquote(line[len(b'copy from '):]), 'copied'
+        elif line.startswith(b'copy to '):
+            entry.new_path, entry.status = _unquote(line[len(b'copy to '):]), 'copied'
+        elif line.startswith(b'new file mode '):
+            entry.status = 'added'
+        elif line.startswith(b'deleted file mode '):
+            entry.status = 'removed'
+        elif line.startswith(b'old mode ') or line.startswith(b'new mode '):
+            entry.mode_changed = True
+        elif line.startswith(b'Binary files ') or line.startswith(b'GIT binary patch'):
+            entry.binary = True
+
+    def _finish_file(self):
+        entry = self._file
+        if entry is None:
+            return
+        if self._hunk is not None:
+            self._close_hunk()
+        entry.end = max(self._last_line_end, entry.start)
+
+        if entry.status is None:
+            if entry.old_path is None and entry.new_path is not None:
+                entry.status = 'added'
+            elif entry.new_path is None and entry.old_path is not None:
+                entry.status = 'removed'
+            elif entry.mode_changed and not entry.hunks and not entry.binary:
+                entry.status = 'changed'
+            else:
+                entry.status = 'modified'
+        # Sections without ---/+++ lines (binary or empty files) only have the provisional paths
+        if entry.status == 'added':
+            entry.old_path = None
+        elif entry.status == 'removed':
+            entry.new_path = None
+        self.files.append(entry)
+        self._file = None
+
+
+def parse_diff(data: Buffer) -> DiffIndex:
+    """Indexes a complete diff held in memory"""
+    parser = DiffParser()
+    parser.feed(data)
+    return parser.close()
+
+
+def iter_changed_lines(patch: Union[str, Buffer]) -> Iterator[Tuple[str, str]]:
+    """
+    Yields ('+', text) for added and ('-', text) for removed lines of a diff or
+    of a hunks-only patch, in order, without the +/- marker.
+    """
+    if isinstance(patch, str):
+        patch = patch.encode('utf-8')
+    source = memoryview(patch)
+    for entry in parse_diff(patch):
+        for hunk in entry.hunks:
+            body = bytes(source[hunk.start:hunk.end])
+            for line in body.split(b'\n')[1:]:
+                if line[:1] in (b'+', b'-'):
+                    yield line[:1].decode(), line[1:].decode('utf-8', errors='replace')
@@ -0,0 +1,180 @@
+import asyncio
+import codecs
+import os
+import tempfile
+from typing import AsyncIterator, Dict, List, Optional
+
+from . import GIT_MIRROR_ROOT, MAX_COMMIT_LIMIT
+from .diff_parser import parse_diff
+
+# Field and record separators that cannot appear in git's own output
+FIELD_SEP = '\x1f'
+RECORD_SEP = '\x1e'
+HEADER_END = '\x1d'
+
+LOG_FORMAT = f'{RECORD_SEP}%H{FIELD_SEP}%P{FIELD_SEP}%an{FIELD_SEP}%aI{FIELD_SEP}%B{HEADER_END}'
+
+# git --raw status letters mapped to the status names used by the GitHub API
+FILE_STATUSES = {
+    'A': 'added',
+    'M': 'modified',
+    'D': 'removed',
+    'R': 'renamed',
+    'C': 'copied',
+    'T': 'changed'
+}
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class LocalGitSource:
+    """
+    Reads commit history from a local clone or bare mirror instead of the GitHub API.
+
+    History comes from one streamed `git log --raw --numstat --parents` run and is
+    yielded in the same shape as the REST commit list, with file names and line
+    stats already filled in; merges are diffed against their first parent, as
+    on GitHub. Patches are only read, through `git show`, when a
+    commit's full detail is requested.
+    """
+
+    def __init__(self, path: str, rev: str = 'HEAD'):
+        if not os.path.isdir(path):
+            raise ValueError(f'Git repository not found at {path}')
+        self.path = path
+        self.rev = rev
+
+    @classmethod
+    def for_mirror(cls, owner: str, repo: str, root: Optional[str] = GIT_MIRROR_ROOT) -> 'LocalGitSource':
+        """Locates the mirror of owner/repo under root, as either <repo>.git or <repo>"""
+        if not root:
+            raise ValueError('GIT_MIRROR_ROOT is not configured')
+        for name in (f'{repo}.git', repo):
+            path = os.path.join(root, owner, name)
+            if os.path.isdir(path):
+                return cls(path)
+        raise ValueError(f'No local mirror of {owner}/{repo} under {root}')
+
+    async def _git(self, *args: str, stderr=asyncio.subprocess.PIPE) -> asyncio.subprocess.Process:
+        return await asyncio.create_subprocess_exec(
+            'git', '-C', self.path, '-c', 'core.quotePath=false', *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=stderr
+        )
+
+    def _parse_record(self, record: str) -> Dict:
+        """Parses one git log record into a REST-shaped commit list entry"""
+        header, _, changes = record.partition(HEADER_END)
+        sha, parents, author, date, message = header.split(FIELD_SEP, 4)
+
+        files = []
+        additions = deletions = 0
+        for line in changes.splitlines():
+            if line.startswith(':'):
+                # :<old mode> <new mode> <old blob> <new blob> <status>\t<path>[\t<new path>]
+                meta, _, paths = line.partition('\t')
+                status = meta.split()[-1][:1]
+                files.append({'filename': paths.split('\t')[-1], 'status': FILE_STATUSES.get(status, 'modified')})
+            elif line and line[0] in '0123456789-':
+                # <additions>\t<deletions>\t<path>, with '-' for binary files
+                added, deleted, _ = line.split('\t', 2)
+                additions += int(added) if added.isdigit() else 0
+                deletions += int(deleted) if deleted.isdigit() else 0
+
+        return {
+            'sha': sha,
+            'url': None,
+            'parents': [{'sha': p} for p in parents.split()],
+            'commit': {
+                'message': message.rstrip('\n'),
+                'author': {'name': author, 'date': date}
+            },
+            'files': files,
+            'files_changed': [f['filename'] for f in files],
+            'files_count': len(files),
+            'stats': {'additions': additions, 'deletions': deletions, 'total': additions + deletions}
+        }
+
+    async def iter_commits(self, limit: int) -> AsyncIterator[Dict]:
+        """Streams up to limit commits, newest first, parsing git log output as it is produced"""
+        limit = max(0, min(limit, MAX_COMMIT_LIMIT))
+        if limit == 0:
+            return
+
+        # stderr is only read once stdout is drained, so it goes to a file rather than a pipe that could fill up
+        errors = tempfile.TemporaryFile()
+        # Merges are diffed against their first parent, like fetch_detail and the GitHub API
+        process = await self._git(
+            'log', '--no-color', '--raw', '--numstat', '--parents', '--diff-merges=first-parent',
+            f'--format={LOG_FORMAT}', f'--max-count={limit}', self.rev,
+            stderr=errors
+        )
+        # Decode incrementally so multi-byte characters split across chunks survive
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        buffer = ''
+        try:
+            while True:
+                chunk = await process.stdout.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                buffer += decoder.decode(chunk)
+                records = buffer.split(RECORD_SEP)
+                # The last record may still be incomplete
+                buffer = records.pop()
+                for record in records:
+                    if record:
+                        yield self._parse_record(record)
+
+            buffer += decoder.decode(b'', final=True)
+            if buffer:
+                yield self._parse_record(buffer)
+
+            await process.wait()
+            if process.returncode != 0:
+                errors.seek(0)
+                error = errors.read().decode('utf-8', errors='replace')
+                raise Exception(f'Failed to read git history: {error.strip()}')
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            errors.close()
+
+    async def head_sha(self) -> str:
+        """Returns the SHA of the commit that rev points to"""
+        process = await self._git('rev-parse', '--verify', f'{self.rev}^{{commit}}')
+        output, error = await process.communicate()
+        if process.returncode != 0:
+            raise Exception(f'Failed to resolve {self.rev}: {error.decode("utf-8", errors="replace").strip()}')
+        return output.decode('utf-8').strip()
+
+    async def fetch_detail(self, sha: str) -> Dict:
+        """
+        Returns a commit's changed files with their patches, shaped like the REST
+        commit detail. Merges are diffed against their first parent, as on GitHub.
+        """
+        process = await self._git('show', '--no-color', '--format=', '--patch', '-m', '--first-parent', sha)
+        output, error = await process.communicate()
+        if process.returncode != 0:
+            raise Exception(f'Failed to read commit {sha}: {error.decode("utf-8", errors="replace").strip()}')
+
+        files: List[Dict] = []
+        for entry in parse_diff(output):
+            file = {
+                'filename': entry.path,
+                'status': entry.status,
+                'additions': entry.additions,
+                'deletions': entry.deletions,
+                'patch': bytes(entry.patch(output)).decode('utf-8', errors='replace')
+            }
+            if entry.status == 'renamed':
+                file['previous_filename'] = entry.old_path
+            files.append(file)
+
+        additions = sum(f['additions'] for f in files)
+        deletions = sum(f['deletions'] for f in files)
+        return {
+            'sha': sha,
+            'files': files,
+            'stats': {'additions': additions, 'deletions': deletions, 'total': additions + deletions}
+        }
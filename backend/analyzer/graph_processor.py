@@ -1,24 +1,66 @@
 import networkx as nx
 from typing import Dict, List, Any, Optional
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timezone
+import gc
 import logging
 from collections import defaultdict
+from contextlib import contextmanager
+
+from .commit_graph import CommitGraph
+from .layering import LAYOUT_STRATEGIES, assign_levels, multipartite_positions
+from .lod import chain_graph, collapse_chains
+from .path_stats import branch_path_stats, max_root_distance
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# x offset of edge control points from the edge midpoint
+CONTROL_POINT_OFFSET = 20
+
+@contextmanager
+def gc_paused():
+    """
+    Suspends cyclic garbage collection while a payload is built. Hundreds of
+    thousands of fresh dicts would otherwise set off repeated collections,
+    each walking the whole commit graph, although none of them can be garbage.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
 class GraphProcessor:
-    def __init__(self, graph: nx.DiGraph):
+    def __init__(self, graph: nx.DiGraph, layout_strategy: str = 'longest_path',
+                 max_layer_width: Optional[int] = None):
         """
         Initialize the GraphProcessor with a NetworkX DiGraph.
         
         Args:
             graph (nx.DiGraph): The directed graph to process
+            layout_strategy (str): How commits are assigned to layers, one of LAYOUT_STRATEGIES
+            max_layer_width (int, optional): Most commits per layer for the 'coffman_graham' strategy
         """
+        if layout_strategy not in LAYOUT_STRATEGIES:
+            raise ValueError(f"Unknown layout strategy '{layout_strategy}'")
         self.graph = graph
+        self.layout_strategy = layout_strategy
+        self.max_layer_width = max_layer_width
         self.layout = None
+        self.commit_graph: Optional[CommitGraph] = None
+        self.node_ids: List[str] = []
+        # Attribute dicts of the nodes, in self.node_ids order
+        self.node_attributes: List[Dict[str, Any]] = []
+        self.ordinals: Optional[np.ndarray] = None
+        self.levels: Optional[np.ndarray] = None
+        self.in_degree: Optional[np.ndarray] = None
+        self.edge_sources: Optional[np.ndarray] = None
+        self.edge_targets: Optional[np.ndarray] = None
+        self.control_points: Optional[np.ndarray] = None
         logger.info(f"Initialized GraphProcessor with graph containing {self.graph.number_of_nodes()} nodes")
 
     def process_for_visualization(self) -> Dict:
@@ -46,6 +88,9 @@ class GraphProcessor:
             self.layout = self._calculate_layout()
             logger.info("Layout calculation completed")
 
+            # Compute per-node and per-edge arrays once, then emit the payload from them
+            self._calculate_render_arrays()
+
             # Process nodes and edges
             nodes = self._process_nodes()
             edges = self._process_edges()
@@ -65,150 +110,482 @@ class GraphProcessor:
             logger.error(f"Error in process_for_visualization: {str(e)}")
             raise
 
-    def _calculate_layout(self) -> Dict[str, Dict[str, float]]:
+    def process_columnar(self) -> Dict[str, Any]:
+        """
+        Process the graph into flat arrays and string tables for the compact
+        columnar payload. Authors and file paths are dictionary-encoded.
+        
+        Returns:
+            Dict: 'columns' (name -> np.ndarray), 'strings' (name -> List[str]) and 'metrics'
+        """
+        try:
+            logger.info("Starting columnar graph processing")
+
+            self._prepare_layout()
+
+            n = len(self.node_ids)
+            authors: Dict[str, int] = {}
+            files: Dict[str, int] = {}
+            author_index = np.empty(n, dtype=np.int32)
+            files_count = np.empty(n, dtype=np.int32)
+            dates = self._node_timestamps()
+            file_offsets = np.zeros(n + 1, dtype=np.int32)
+            file_index: List[int] = []
+            messages: List[str] = []
+            analyses: List[str] = []
+            flags = (self.in_degree > 1).astype(np.uint8) << 1
+
+            for i, node in enumerate(self.node_ids):
+                node_data = self.graph.nodes[node]
+                author_index[i] = authors.setdefault(node_data.get('author', ''), len(authors))
+                files_count[i] = node_data.get('files_count', 0)
+                if node_data.get('is_initial', False):
+                    flags[i] |= 1
+                if node_data.get('error'):
+                    flags[i] |= 4
+                for filename in node_data.get('files_changed', []):
+                    file_index.append(files.setdefault(filename, len(files)))
+                file_offsets[i + 1] = len(file_index)
+                messages.append(node_data.get('message', ''))
+                analyses.append(node_data.get('analysis', ''))
+
+            columns = {
+                'positions': self.layout.astype(np.float32),
+                'node_flags': flags,
+                'files_count': files_count,
+                'dates': dates,
+                'author_index': author_index,
+                'file_offsets': file_offsets,
+                'file_index': np.asarray(file_index, dtype=np.int32),
+                'edge_sources': self.edge_sources.astype(np.int32),
+                'edge_targets': self.edge_targets.astype(np.int32),
+                'control_points': self.control_points.astype(np.float32),
+                'edge_flags': (self.in_degree[self.edge_targets] > 1).astype(np.uint8)
+            }
+            strings = {
+                'ids': self.node_ids,
+                'messages': messages,
+                'analysis': analyses,
+                'authors': list(authors),
+                'files': list(files)
+            }
+
+            logger.info(f"Processed {n} nodes and {len(self.edge_sources)} edges into columns")
+            return {'columns': columns, 'strings': strings, 'metrics': self._calculate_metrics()}
+
+        except Exception as e:
+            logger.error(f"Error in process_columnar: {str(e)}")
+            raise
+
+    def _calculate_layout(self) -> np.ndarray:
         """
         Calculate the layout positions for all nodes.
+
+        Levels are assigned in a single topological pass by the configured
+        strategy, and the multipartite x/y/z coordinates are computed for all
+        nodes at once.
         
         Returns:
-            Dict: Node positions in 3D space
+            np.ndarray: (n, 3) node positions in 3D space, in graph node order
         """
         try:
-            # Find root nodes (nodes with no incoming edges)
-            roots = [n for n in self.graph.nodes() if self.graph.in_degree(n) == 0]
-            if not roots:
-                # If no root found, use node with minimum in-degree
-                roots = [min(self.graph.nodes(), key=lambda n: self.graph.in_degree(n))]
-            
-            # Calculate levels based on longest path from any root
-            levels = {}
-            for node in self.graph.nodes():
-                max_distance = 0
-                for root in roots:
-                    try:
-                        distance = nx.shortest_path_length(self.graph, root, node)
-                        max_distance = max(max_distance, distance)
-                    except nx.NetworkXNoPath:
-                        continue
-                levels[node] = max_distance
-
-            # Create a temporary graph for layout calculation
-            temp_graph = self.graph.copy()
-            for node in temp_graph.nodes():
-                temp_graph.nodes[node]['subset'] = levels[node]
-
-            # Calculate initial layout
-            pos = nx.multipartite_layout(temp_graph, subset_key='subset', scale=100)
-
-            # Convert to 3D coordinates with proper scaling
-            layout_3d = {}
-            for node, pos_2d in pos.items():
-                layout_3d[node] = {
-                    'x': float(pos_2d[0]),
-                    'y': float(pos_2d[1]),
-                    'z': float(levels[node] * 10)  # Use level for Z-coordinate
-                }
+            self.node_ids = list(self.graph.nodes())
+            self.node_attributes = [data for _, data in self.graph.nodes(data=True)]
+
+            commit_graph = self._get_commit_graph()
+            ordinals = self.ordinals = commit_graph.indices(self.node_ids)
+
+            timestamps = None
+            if self.layout_strategy == 'date':
+                timestamps = np.zeros(len(commit_graph))
+                timestamps[ordinals] = [
+                    date.timestamp() if isinstance(date, datetime) else 0.0
+                    for date in (self.graph.nodes[node].get('date') for node in self.node_ids)
+                ]
+
+            levels = self.levels = assign_levels(
+                commit_graph,
+                self.layout_strategy,
+                timestamps=timestamps,
+                max_width=self.max_layer_width
+            )[ordinals]
 
-            logger.info("Layout calculation successful")
+            # Within a level, nodes keep their graph order
+            layout_3d = multipartite_positions(levels, np.arange(len(self.node_ids)), scale=100)
+
+            logger.info(f"Layout calculation successful ({self.layout_strategy})")
             return layout_3d
 
         except Exception as e:
             logger.error(f"Error in _calculate_layout: {str(e)}")
             raise
 
-    def _process_nodes(self) -> List[Dict[str, Any]]:
+    def process_level_range(self, min_level: int = 0, max_level: Optional[int] = None) -> Dict:
         """
-        Process nodes with their positions and attributes.
-        
+        Process only the nodes whose layout level lies in [min_level, max_level],
+        with the edges between them. Positions are those of the full layout, so
+        slices can be stitched together on the client.
+
+        Args:
+            min_level: First level to include
+            max_level: Last level to include (defaults to the deepest level)
+
         Returns:
-            List[Dict]: Processed node data
+            Dict: nodes, edges, the total level count and the full graph's metrics
         """
         try:
-            nodes = []
-            for node in self.graph.nodes():
+            self._prepare_layout()
+            last_level = int(self.levels.max()) if len(self.node_ids) else -1
+            if max_level is None:
+                max_level = last_level
+            mask = (self.levels >= min_level) & (self.levels <= max_level)
+            result = self._process_subset(mask)
+            result['levels'] = {'min': min_level, 'max': max_level, 'count': last_level + 1}
+            return result
+
+        except Exception as e:
+            logger.error(f"Error in process_level_range: {str(e)}")
+            raise
+
+    def process_date_window(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict:
+        """
+        Process only the commits dated within [since, until], with the edges
+        between them. Naive datetimes are taken as UTC.
+
+        Args:
+            since: Earliest commit date to include (unbounded when None)
+            until: Latest commit date to include (unbounded when None)
+
+        Returns:
+            Dict: nodes, edges, the window and the full graph's metrics
+        """
+        try:
+            self._prepare_layout()
+            timestamps = self._node_timestamps()
+            mask = ~np.isnan(timestamps)
+            if since is not None:
+                mask &= timestamps >= self._as_utc(since).timestamp()
+            if until is not None:
+                mask &= timestamps <= self._as_utc(until).timestamp()
+            result = self._process_subset(mask)
+            result['window'] = {
+                'since': since.isoformat() if since else None,
+                'until': until.isoformat() if until else None
+            }
+            return result
+
+        except Exception as e:
+            logger.error(f"Error in process_date_window: {str(e)}")
+            raise
+
+    def process_overview(self) -> Dict:
+        """
+        Process a coarse view of the graph in which every linear chain of commits
+        is collapsed into one super-node carrying aggregate stats. The chains are
+        laid out as their own DAG with the configured strategy; each super-node
+        records the level range of its commits in the full layout so that the
+        client can drill in with process_level_range.
+
+        Returns:
+            Dict: super-nodes, edges between them and the full graph's metrics
+        """
+        try:
+            self._prepare_layout()
+            if not self.node_ids:
+                return {'nodes': [], 'edges': [], 'metrics': self._calculate_metrics()}
+
+            commit_graph = self._get_commit_graph()
+            chain_of, heads = collapse_chains(commit_graph)
+            chains = chain_graph(commit_graph, chain_of, heads)
+            chain_count = len(heads)
+
+            # Chain of each node in graph order, and per-chain aggregates
+            node_chain = chain_of[self.ordinals]
+            timestamps = self._node_timestamps()
+            commit_counts = np.bincount(node_chain, minlength=chain_count)
+            first_level = np.full(chain_count, np.iinfo(np.int64).max)
+            last_level = np.full(chain_count, -1)
+            np.minimum.at(first_level, node_chain, self.levels)
+            np.maximum.at(last_level, node_chain, self.levels)
+            first_date = np.full(chain_count, np.inf)
+            last_date = np.full(chain_count, -np.inf)
+            dated = ~np.isnan(timestamps)
+            np.minimum.at(first_date, node_chain[dated], timestamps[dated])
+            np.maximum.at(last_date, node_chain[dated], timestamps[dated])
+
+            files_counts = np.zeros(chain_count, dtype=np.int64)
+            error_counts = np.zeros(chain_count, dtype=np.int64)
+            authors = [set() for _ in range(chain_count)]
+            tails: List[Optional[str]] = [None] * chain_count
+            tail_generation = np.zeros(chain_count, dtype=np.int64)
+            generation = commit_graph.generation[self.ordinals].tolist()
+            for i, (node, chain) in enumerate(zip(self.node_ids, node_chain.tolist())):
                 node_data = self.graph.nodes[node]
-                position = self.layout[node]
-                
-                # Process node attributes with defaults
-                processed_node = {
-                    'id': node,
-                    'position': position,
+                files_counts[chain] += node_data.get('files_count', 0)
+                error_counts[chain] += bool(node_data.get('error'))
+                authors[chain].add(node_data.get('author', ''))
+                if generation[i] >= tail_generation[chain]:
+                    tail_generation[chain] = generation[i]
+                    tails[chain] = node
+
+            # Lay the chain DAG out like a commit graph (chains span dates, so 'date' falls back to longest path)
+            chain_ordinals = chains.indices([commit_graph.sha(head) for head in heads.tolist()])
+            chain_levels = assign_levels(
+                chains,
+                'longest_path' if self.layout_strategy == 'date' else self.layout_strategy,
+                max_width=self.max_layer_width
+            )[chain_ordinals]
+            positions = multipartite_positions(chain_levels, np.arange(chain_count), scale=100)
+
+            head_in_degree = commit_graph.in_degree()[heads]
+            node_of = np.empty(len(commit_graph), dtype=np.int64)
+            node_of[self.ordinals] = np.arange(len(self.node_ids))
+            head_ids = [self.node_ids[i] for i in node_of[heads].tolist()]
+
+            def iso(timestamp: float) -> str:
+                return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if np.isfinite(timestamp) else ''
+
+            nodes = []
+            for chain, (x, y, z) in enumerate(positions.tolist()):
+                nodes.append({
+                    'id': head_ids[chain],
+                    'position': {'x': x, 'y': y, 'z': z},
                     'data': {
-                        'message': node_data.get('message', ''),
-                        'author': node_data.get('author', ''),
-                        'date': node_data.get('date', datetime.now()).isoformat() 
-                               if isinstance(node_data.get('date'), datetime) else '',
-                        'files_count': node_data.get('files_count', 0),
-                        'is_initial': node_data.get('is_initial', False),
-                        'is_merge': self.graph.in_degree(node) > 1,
-                        'files_changed': node_data.get('files_changed', []),
-                        'analysis': node_data.get('analysis', '')
+                        'commit_count': int(commit_counts[chain]),
+                        'head': head_ids[chain],
+                        'tail': tails[chain],
+                        'first_date': iso(first_date[chain]),
+                        'last_date': iso(last_date[chain]),
+                        'author_count': len(authors[chain]),
+                        'files_count': int(files_counts[chain]),
+                        'error_count': int(error_counts[chain]),
+                        'is_merge': bool(head_in_degree[chain] > 1),
+                        'level_range': {'min': int(first_level[chain]), 'max': int(last_level[chain])}
+                    }
+                })
+
+            # Edges between super-nodes, in chain id order
+            sources, targets = chains.edges()
+            chain_id = np.empty(chain_count, dtype=np.int64)
+            chain_id[chain_ordinals] = np.arange(chain_count)
+            sources, targets = chain_id[sources], chain_id[targets]
+            control_points = self._calculate_control_points(positions[sources], positions[targets])
+            edges = [
+                {
+                    'source': head_ids[source],
+                    'target': head_ids[target],
+                    'controlPoint': {'x': x, 'y': y, 'z': z},
+                    'data': {
+                        'is_merge': bool(head_in_degree[target] > 1)
                     }
                 }
-                nodes.append(processed_node)
-            
-            return nodes
+                for source, target, (x, y, z) in zip(sources.tolist(), targets.tolist(), control_points.tolist())
+            ]
+
+            logger.info(f"Collapsed {len(self.node_ids)} commits into {chain_count} chains")
+            return {'nodes': nodes, 'edges': edges, 'metrics': self._calculate_metrics()}
+
+        except Exception as e:
+            logger.error(f"Error in process_overview: {str(e)}")
+            raise
+
+    def _prepare_layout(self):
+        """Compute the full layout and render arrays once, shared by all views"""
+        if not isinstance(self.graph, nx.DiGraph):
+            raise ValueError("Input must be a NetworkX DiGraph")
+        if self.layout is not None:
+            return
+        if self.graph.number_of_nodes() == 0:
+            self.layout = np.zeros((0, 3))
+            self.node_ids = []
+            self.node_attributes = []
+            self.ordinals = np.zeros(0, dtype=np.int32)
+            self.levels = np.zeros(0, dtype=np.int64)
+        else:
+            self.layout = self._calculate_layout()
+        self._calculate_render_arrays()
+
+    def _process_subset(self, mask: np.ndarray) -> Dict:
+        """Emit the nodes selected by a boolean mask over self.node_ids and the edges among them"""
+        selected = np.flatnonzero(mask)
+        edges = np.flatnonzero(mask[self.edge_sources] & mask[self.edge_targets])
+        nodes = self._process_nodes(selected)
+        logger.info(f"Processed {len(nodes)} of {len(self.node_ids)} nodes and {len(edges)} edges")
+        return {
+            'nodes': nodes,
+            'edges': self._process_edges(edges),
+            'total_nodes': len(self.node_ids),
+            'metrics': self._calculate_metrics()
+        }
+
+    def _node_timestamps(self) -> np.ndarray:
+        """Commit times in seconds per node in self.node_ids, NaN where the date is missing"""
+        timestamps = np.full(len(self.node_ids), np.nan)
+        for i, node in enumerate(self.node_ids):
+            date = self.graph.nodes[node].get('date')
+            if isinstance(date, datetime):
+                timestamps[i] = self._as_utc(date).timestamp()
+        return timestamps
+
+    @staticmethod
+    def _as_utc(date: datetime) -> datetime:
+        return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+    def _get_commit_graph(self) -> CommitGraph:
+        """Returns the compact form of the graph, building it on first use"""
+        if self.commit_graph is None:
+            self.commit_graph = CommitGraph.from_networkx(self.graph)
+        return self.commit_graph
+
+    def _calculate_render_arrays(self):
+        """
+        Compute degrees, merge flags, edge endpoints and control points for the
+        whole graph as NumPy arrays indexed by position in self.node_ids.
+        """
+        try:
+            commit_graph = self._get_commit_graph()
+
+            # Map commit ordinals back to graph node order
+            node_of = np.empty(len(commit_graph), dtype=np.int64)
+            node_of[self.ordinals] = np.arange(len(self.node_ids))
+
+            self.in_degree = commit_graph.in_degree()[self.ordinals]
+            parents, children = commit_graph.edges()
+            self.edge_sources = node_of[parents]
+            self.edge_targets = node_of[children]
+            self.control_points = self._calculate_control_points(
+                self.layout[self.edge_sources],
+                self.layout[self.edge_targets]
+            )
+
+        except Exception as e:
+            logger.error(f"Error in _calculate_render_arrays: {str(e)}")
+            raise
+
+    def _process_nodes(self, selected: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        Process nodes with their positions and attributes.
+        
+        Args:
+            selected: Indices into self.node_ids to emit (defaults to all nodes)
+
+        Returns:
+            List[Dict]: Processed node data
+        """
+        try:
+            if selected is None:
+                node_ids = self.node_ids
+                attributes = self.node_attributes
+                positions = self.layout.tolist()
+                is_merge = (self.in_degree > 1).tolist()
+            else:
+                indices = selected.tolist()
+                node_ids = [self.node_ids[i] for i in indices]
+                attributes = [self.node_attributes[i] for i in indices]
+                positions = self.layout[selected].tolist()
+                is_merge = (self.in_degree[selected] > 1).tolist()
+
+            # Pull each attribute column once, with its default, then zip the columns into the payload
+            def column(name: str, default: Any) -> List[Any]:
+                return [data.get(name, default) for data in attributes]
+
+            dates = [
+                date.isoformat() if isinstance(date, datetime) else ''
+                for date in column('date', None)
+            ]
+            with gc_paused():
+                return [
+                    {
+                        'id': node,
+                        'position': {'x': x, 'y': y, 'z': z},
+                        'data': {
+                            'message': message,
+                            'author': author,
+                            'date': date,
+                            'files_count': files_count,
+                            'is_initial': is_initial,
+                            'is_merge': merge,
+                            'files_changed': files_changed,
+                            'languages': languages,
+                            'analysis': analysis,
+                            'error': error
+                        }
+                    }
+                    for node, (x, y, z), message, author, date, files_count, is_initial, merge,
+                        files_changed, languages, analysis, error in zip(
+                        node_ids,
+                        positions,
+                        column('message', ''),
+                        column('author', ''),
+                        dates,
+                        column('files_count', 0),
+                        column('is_initial', False),
+                        is_merge,
+                        column('files_changed', []),
+                        column('languages', {}),
+                        column('analysis', ''),
+                        column('error', None)
+                    )
+                ]
 
         except Exception as e:
             logger.error(f"Error in _process_nodes: {str(e)}")
             raise
 
-    def _process_edges(self) -> List[Dict[str, Any]]:
+    def _process_edges(self, selected: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
         """
         Process edges with their positions and attributes.
         
+        Args:
+            selected: Indices into the edge arrays to emit (defaults to all edges)
+
         Returns:
             List[Dict]: Processed edge data
         """
         try:
-            edges = []
-            for source, target in self.graph.edges():
-                # Get positions for source and target nodes
-                source_pos = self.layout[source]
-                target_pos = self.layout[target]
-                
-                # Calculate control point for curved edges
-                control_point = self._calculate_control_point(source_pos, target_pos)
-                
-                edge_data = {
-                    'source': source,
-                    'target': target,
-                    'controlPoint': control_point,
-                    'data': {
-                        'is_merge': self.graph.in_degree(target) > 1
+            if selected is None:
+                selected = np.arange(len(self.edge_sources))
+            node_ids = self.node_ids
+            sources = self.edge_sources[selected]
+            targets = self.edge_targets[selected]
+            is_merge = (self.in_degree[targets] > 1).tolist()
+            with gc_paused():
+                return [
+                    {
+                        'source': node_ids[source],
+                        'target': node_ids[target],
+                        'controlPoint': {'x': x, 'y': y, 'z': z},
+                        'data': {
+                            'is_merge': merge
+                        }
                     }
-                }
-                edges.append(edge_data)
-            
-            return edges
+                    for source, target, (x, y, z), merge in zip(
+                        sources.tolist(),
+                        targets.tolist(),
+                        self.control_points[selected].tolist(),
+                        is_merge
+                    )
+                ]
 
         except Exception as e:
             logger.error(f"Error in _process_edges: {str(e)}")
             raise
 
-    def _calculate_control_point(self, source_pos: Dict[str, float], 
-                               target_pos: Dict[str, float]) -> Dict[str, float]:
+    def _calculate_control_points(self, source_pos: np.ndarray, target_pos: np.ndarray) -> np.ndarray:
         """
-        Calculate a control point for curved edges.
+        Calculate control points for curved edges.
         
         Args:
-            source_pos: Source node position
-            target_pos: Target node position
+            source_pos: (m, 3) source node positions
+            target_pos: (m, 3) target node positions
             
         Returns:
-            Dict: Control point coordinates
+            np.ndarray: (m, 3) control point coordinates
         """
-        # Calculate midpoint
-        mid_x = (source_pos['x'] + target_pos['x']) / 2
-        mid_y = (source_pos['y'] + target_pos['y']) / 2
-        mid_z = (source_pos['z'] + target_pos['z']) / 2
-        
-        # Add offset for curvature
-        offset = 20
-        return {
-            'x': mid_x + offset,
-            'y': mid_y,
-            'z': mid_z
-        }
+        # Midpoint, offset along x for curvature
+        control_points = (source_pos + target_pos) / 2
+        control_points[:, 0] += CONTROL_POINT_OFFSET
+        return control_points
 
     def _calculate_metrics(self) -> Dict[str, Any]:
         """
@@ -222,32 +599,30 @@ class GraphProcessor:
                 return {
                     'total_commits': 0,
                     'max_depth': 0,
+                    'longest_path': 0,
                     'branching_factor': 0,
                     'leaf_commits': 0,
                     'merge_commits': 0,
                     'average_branch_length': 0,
+                    'branch_path_count': 0,
+                    'total_branch_length': 0,
+                    'longest_branch_length': 0,
                     'commit_frequency': {}
                 }
 
             # Calculate basic metrics
             total_commits = self.graph.number_of_nodes()
-            merge_commits = sum(1 for n in self.graph.nodes() if self.graph.in_degree(n) > 1)
-            leaf_commits = sum(1 for n in self.graph.nodes() if self.graph.out_degree(n) == 0)
+            commit_graph = self._get_commit_graph()
+            merge_commits = int((commit_graph.in_degree() > 1).sum())
+            leaf_commits = int((commit_graph.out_degree() == 0).sum())
             
-            # Calculate max depth
-            roots = [n for n in self.graph.nodes() if self.graph.in_degree(n) == 0]
-            max_depth = 0
-            for root in roots:
-                try:
-                    depths = nx.shortest_path_length(self.graph, source=root).values()
-                    if depths:
-                        max_depth = max(max_depth, max(depths))
-                except nx.NetworkXError:
-                    continue
-
-            # Calculate average branch length
-            paths = self._calculate_all_branch_paths()
-            avg_branch_length = sum(len(path) for path in paths) / max(len(paths), 1)
+            # Deepest breadth-first level below a root, and the most edges on any root-to-commit path;
+            # generation numbers start at 1 for root commits
+            max_depth = max_root_distance(commit_graph)
+            longest_path = int(commit_graph.generation.max()) - 1
+
+            # Calculate root-to-leaf path statistics without enumerating paths
+            path_stats = branch_path_stats(commit_graph)
 
             # Calculate commit frequency by author
             commit_frequency = defaultdict(int)
@@ -258,39 +633,17 @@ class GraphProcessor:
             return {
                 'total_commits': total_commits,
                 'max_depth': max_depth,
+                'longest_path': longest_path,
                 'branching_factor': total_commits / max(1, total_commits - merge_commits),
                 'leaf_commits': leaf_commits,
                 'merge_commits': merge_commits,
-                'average_branch_length': avg_branch_length,
+                'average_branch_length': path_stats['average_length'],
+                'branch_path_count': path_stats['path_count'],
+                'total_branch_length': path_stats['total_length'],
+                'longest_branch_length': path_stats['longest_length'],
                 'commit_frequency': dict(commit_frequency)
             }
 
         except Exception as e:
             logger.error(f"Error in _calculate_metrics: {str(e)}")
-            raise
-
-    def _calculate_all_branch_paths(self) -> List[List[str]]:
-        """
-        Calculate all unique paths from root to leaf nodes.
-        
-        Returns:
-            List[List[str]]: List of paths
-        """
-        try:
-            roots = [n for n in self.graph.nodes() if self.graph.in_degree(n) == 0]
-            leaves = [n for n in self.graph.nodes() if self.graph.out_degree(n) == 0]
-            
-            all_paths = []
-            for root in roots:
-                for leaf in leaves:
-                    try:
-                        paths = list(nx.all_simple_paths(self.graph, root, leaf))
-                        all_paths.extend(paths)
-                    except nx.NetworkXNoPath:
-                        continue
-            
-            return all_paths
-
-        except Exception as e:
-            logger.error(f"Error in _calculate_all_branch_paths: {str(e)}")
-            return []
\ No newline at end of file
+            raise
\ No newline at end of file
@@ -0,0 +1,123 @@
+import aiohttp
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from . import GITHUB_PAGE_SIZE, MAX_COMMIT_LIMIT
+from .scheduler import RequestFailed, RequestScheduler
+
+GRAPHQL_URL = 'https://api.github.com/graphql'
+
+HISTORY_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    defaultBranchRef {
+      target {
+        ... on Commit {
+          history(first: $first, after: $after) {
+            pageInfo { hasNextPage endCursor }
+            nodes {
+              oid
+              message
+              author { name date }
+              committedDate
+              parents(first: 10) { nodes { oid } }
+              additions
+              deletions
+              changedFilesIfAvailable
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+class GraphQLCommitSource:
+    """
+    Streams commit history through the GitHub GraphQL API, up to 100 commits
+    (with parents, authors and change stats) per round trip.
+
+    Commits are yielded in the same shape as the REST list endpoint, plus
+    'files_count' and 'stats', so the analyzer can build the graph unchanged.
+    GraphQL does not expose file names or patches; those still require the
+    REST commit endpoint found under each commit's 'url'.
+    """
+
+    def __init__(self, headers: Dict[str, str], scheduler: RequestScheduler):
+        self.headers = headers
+        self.scheduler = scheduler
+
+    async def _fetch_history_page(self, session: aiohttp.ClientSession, owner: str, repo: str,
+                                  first: int, after: Optional[str]) -> Tuple[List[Dict], Optional[str]]:
+        """Fetches one page of history and the cursor of the next page, if any"""
+        try:
+            result = await self.scheduler.request_json(
+                session,
+                'POST',
+                GRAPHQL_URL,
+                headers=self.headers,
+                json={
+                    'query': HISTORY_QUERY,
+                    'variables': {'owner': owner, 'name': repo, 'first': first, 'after': after}
+                }
+            )
+        except RequestFailed as e:
+            raise Exception(f'Failed to fetch commits: {e}')
+
+        if result.get('errors'):
+            raise Exception(f"Failed to fetch commits: {'; '.join(e.get('message', '') for e in result['errors'])}")
+
+        repository = (result.get('data') or {}).get('repository') or {}
+        branch = repository.get('defaultBranchRef')
+        if not branch:
+            return [], None
+
+        history = branch['target']['history']
+        page_info = history['pageInfo']
+        commits = [self._to_rest_shape(owner, repo, node) for node in history['nodes']]
+        return commits, page_info['endCursor'] if page_info['hasNextPage'] else None
+
+    def _to_rest_shape(self, owner: str, repo: str, node: Dict) -> Dict:
+        """Converts a GraphQL commit node to the shape of a REST commit list entry"""
+        author = node.get('author') or {}
+        additions = node.get('additions', 0)
+        deletions = node.get('deletions', 0)
+        return {
+            'sha': node['oid'],
+            'url': f"https://api.github.com/repos/{owner}/{repo}/commits/{node['oid']}",
+            'parents': [{'sha': p['oid']} for p in node['parents']['nodes']],
+            'commit': {
+                'message': node['message'],
+                # GitActor.date is nullable; committedDate always is set
+                'author': {'name': author.get('name') or '', 'date': author.get('date') or node['committedDate']}
+            },
+            'files_count': node.get('changedFilesIfAvailable') or 0,
+            'stats': {'additions': additions, 'deletions': deletions, 'total': additions + deletions}
+        }
+
+    async def iter_commits(self, session: aiohttp.ClientSession, owner: str, repo: str, limit: int) -> AsyncIterator[Dict]:
+        """Streams commits newest first, requesting the next page before handing out the current one"""
+        remaining = max(0, min(limit, MAX_COMMIT_LIMIT))
+        if remaining == 0:
+            return
+
+        next_page = asyncio.ensure_future(
+            self._fetch_history_page(session, owner, repo, min(remaining, GITHUB_PAGE_SIZE), None)
+        )
+        try:
+            while next_page is not None:
+                commits, cursor = await next_page
+                next_page = None
+                if cursor and len(commits) < remaining:
+                    next_page = asyncio.ensure_future(self._fetch_history_page(
+                        session, owner, repo, min(remaining - len(commits), GITHUB_PAGE_SIZE), cursor
+                    ))
+
+                for commit in commits[:remaining]:
+                    yield commit
+                remaining -= min(len(commits), remaining)
+        finally:
+            if next_page is not None and not next_page.done():
+                next_page.cancel()
@@ -0,0 +1,133 @@
+import aiohttp
+import asyncio
+import logging
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from . import (HTTP_CONNECT_TIMEOUT, HTTP_DNS_CACHE_TTL, HTTP_KEEPALIVE_TIMEOUT, HTTP_POOL_SIZE,
+               HTTP_POOL_SIZE_PER_HOST, HTTP_READ_TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """
+    Process-wide aiohttp session for GitHub and OpenAI calls.
+
+    All requests share one TCPConnector, so connections (and their TLS
+    sessions) are kept alive and reused across analyses, diff lookups and LLM
+    calls instead of being set up again for every ClientSession. The connector
+    caps connections in total and per host, and caches DNS lookups. Timeouts
+    apply to connecting and to each read rather than to the whole request, so
+    long streamed bodies are not cut off.
+
+    The session is opened lazily in the running event loop and reopened if
+    it was closed or belongs to a different loop (as in scripts that call
+    asyncio.run more than once). The application closes it on shutdown.
+    """
+
+    def __init__(self, limit: int = HTTP_POOL_SIZE, limit_per_host: int = HTTP_POOL_SIZE_PER_HOST,
+                 dns_cache_ttl: int = HTTP_DNS_CACHE_TTL, keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT, read_timeout: float = HTTP_READ_TIMEOUT):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.counters = {
+            'requests': 0,
+            'failed_requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0
+        }
+        self.requests_per_host: Dict[str, int] = {}
+
+    def session(self) -> aiohttp.ClientSession:
+        """Returns the shared session, opening it if needed; must be called from a coroutine"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = self._open()
+            self._loop = loop
+        return self._session
+
+    def _open(self) -> aiohttp.ClientSession:
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_request_end.append(self._on_request_end)
+        trace.on_request_exception.append(self._on_request_exception)
+        trace.on_connection_create_end.append(self._count('connections_created'))
+        trace.on_connection_reuseconn.append(self._count('connections_reused'))
+        trace.on_dns_cache_hit.append(self._count('dns_cache_hits'))
+        trace.on_dns_cache_miss.append(self._count('dns_cache_misses'))
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+        logger.info(f"Opening shared HTTP session ({self.limit} connections, {self.limit_per_host} per host)")
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[trace])
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def _count(self, counter: str):
+        async def callback(session: aiohttp.ClientSession, context: SimpleNamespace, params: Any):
+            self.counters[counter] += 1
+        return callback
+
+    async def _on_request_start(self, session: aiohttp.ClientSession, context: SimpleNamespace,
+                                params: aiohttp.TraceRequestStartParams):
+        self.in_flight += 1
+        self.counters['requests'] += 1
+        host = params.url.host or 'unknown'
+        self.requests_per_host[host] = self.requests_per_host.get(host, 0) + 1
+
+    async def _on_request_end(self, session: aiohttp.ClientSession, context: SimpleNamespace,
+                              params: aiohttp.TraceRequestEndParams):
+        self.in_flight -= 1
+
+    async def _on_request_exception(self, session: aiohttp.ClientSession, context: SimpleNamespace,
+                                    params: aiohttp.TraceRequestExceptionParams):
+        self.in_flight -= 1
+        self.counters['failed_requests'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Request and connection counters, plus connections in use and idle per host"""
+        hosts: Dict[str, Dict[str, int]] = {
+            host: {'requests': count, 'in_use': 0, 'idle': 0} for host, count in self.requests_per_host.items()
+        }
+        connector = self._session.connector if self._session is not None and not self._session.closed else None
+        if connector is not None:
+            # The connector does not expose its pools publicly; read them defensively
+            for key, connections in getattr(connector, '_acquired_per_host', {}).items():
+                hosts.setdefault(key.host, {'requests': 0, 'in_use': 0, 'idle': 0})['in_use'] += len(connections)
+            for key, connections in getattr(connector, '_conns', {}).items():
+                hosts.setdefault(key.host, {'requests': 0, 'in_use': 0, 'idle': 0})['idle'] += len(connections)
+
+        reused, created = self.counters['connections_reused'], self.counters['connections_created']
+        return {
+            **self.counters,
+            'open': connector is not None,
+            'in_flight': self.in_flight,
+            'connection_reuse_rate': reused / (reused + created) if reused + created else 0,
+            'limit': self.limit,
+            'limit_per_host': self.limit_per_host,
+            'hosts': hosts
+        }
+
+
+# Shared by the analyzer, the diff service and the routes
+http_client = HttpClient()
@@ -0,0 +1,149 @@
+import numpy as np
+from typing import Optional
+
+from .commit_graph import CommitGraph
+
+LAYOUT_STRATEGIES = ('longest_path', 'coffman_graham', 'date')
+
+# Default lane width for the date strategy
+DAY_SECONDS = 24 * 60 * 60
+
+
+def longest_path_levels(graph: CommitGraph) -> np.ndarray:
+    """
+    Places every commit one level after its deepest parent, i.e. at the length
+    of the longest path reaching it. These are the generation numbers, so no
+    further traversal is needed.
+    """
+    return graph.generation.astype(np.int64) - 1
+
+
+def coffman_graham_levels(graph: CommitGraph, max_width: int) -> np.ndarray:
+    """
+    Assigns levels holding at most max_width commits each.
+
+    Commits are taken in topological order (by generation, which stands in for
+    the Coffman-Graham labelling) and each is placed on the lowest level above
+    all of its parents that still has room. Levels that fill up are skipped with
+    a path-compressed "next free level" table, so the pass stays near-linear.
+    """
+    if max_width < 1:
+        raise ValueError('max_width must be at least 1')
+
+    n = len(graph)
+    levels = [0] * n
+    fill = [0] * (n + 1)
+    next_free = list(range(n + 1))
+
+    def find(level: int) -> int:
+        root = level
+        while next_free[root] != root:
+            root = next_free[root]
+        while next_free[level] != root:
+            next_free[level], level = root, next_free[level]
+        return root
+
+    parent_starts = graph.parent_offsets.tolist()
+    parents = graph.parent_index.tolist()
+    for node in graph.topological_order().tolist():
+        lowest = 0
+        for parent in parents[parent_starts[node]:parent_starts[node + 1]]:
+            lowest = max(lowest, levels[parent] + 1)
+        level = find(lowest)
+        levels[node] = level
+        fill[level] += 1
+        if fill[level] == max_width:
+            next_free[level] = level + 1
+
+    return np.asarray(levels, dtype=np.int64)
+
+
+def date_levels(timestamps: np.ndarray, lane_seconds: float = DAY_SECONDS) -> np.ndarray:
+    """
+    Groups commits into lanes of lane_seconds by date. Lanes without commits
+    are dropped so that quiet periods do not leave gaps in the layout.
+    """
+    lanes = np.floor((timestamps - timestamps.min()) / lane_seconds).astype(np.int64)
+    _, levels = np.unique(lanes, return_inverse=True)
+    return levels.reshape(-1)
+
+
+def assign_levels(graph: CommitGraph, strategy: str = 'longest_path',
+                  timestamps: Optional[np.ndarray] = None, max_width: Optional[int] = None,
+                  lane_seconds: float = DAY_SECONDS) -> np.ndarray:
+    """
+    Assigns a level to every commit ordinal using the selected strategy.
+
+    Args:
+        graph: The commit graph to layer
+        strategy: One of LAYOUT_STRATEGIES
+        timestamps: Commit times in seconds per ordinal, required by the 'date' strategy
+        max_width: Most commits per level for 'coffman_graham' (defaults to the square root of the commit count)
+        lane_seconds: Lane width for the 'date' strategy
+
+    Returns:
+        np.ndarray: Level per commit ordinal
+    """
+    if len(graph) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if strategy == 'longest_path':
+        return longest_path_levels(graph)
+    if strategy == 'coffman_graham':
+        width = max_width or max(1, int(np.ceil(np.sqrt(len(graph)))))
+        return coffman_graham_levels(graph, width)
+    if strategy == 'date':
+        if timestamps is None:
+            raise ValueError("The 'date' strategy needs commit timestamps")
+        return date_levels(timestamps, lane_seconds)
+    raise ValueError(f"Unknown layout strategy '{strategy}', expected one of {', '.join(LAYOUT_STRATEGIES)}")
+
+
+def multipartite_positions(levels: np.ndarray, order: np.ndarray, scale: float = 100,
+                           level_spacing: float = 10) -> np.ndarray:
+    """
+    Computes 3D positions for layered nodes, matching nx.multipartite_layout.
+
+    Levels become columns along x and the nodes of a level are spread along y
+    in the given order, centred and rescaled to scale. z is the level times
+    level_spacing.
+
+    Args:
+        levels: Level per node
+        order: Node indices in the order they should be stacked within a level
+        scale: Half-extent of the rescaled x/y layout
+        level_spacing: z distance between consecutive levels
+
+    Returns:
+        np.ndarray: (n, 3) array of x, y, z per node
+    """
+    n = len(levels)
+    positions = np.zeros((n, 3), dtype=np.float64)
+    if n == 0:
+        return positions
+
+    # Columns are the distinct levels in ascending order
+    _, column = np.unique(levels, return_inverse=True)
+    column = column.reshape(-1)
+    column_count = int(column.max()) + 1
+    column_sizes = np.bincount(column, minlength=column_count)
+    column_starts = np.concatenate(([0], np.cumsum(column_sizes)[:-1]))
+
+    # Row of each node within its column, following the requested order
+    by_column = order[np.argsort(column[order], kind='stable')]
+    row = np.empty(n, dtype=np.float64)
+    row[by_column] = np.arange(n) - np.repeat(column_starts, column_sizes)
+
+    xy = np.column_stack([
+        column - (column_count - 1) / 2,
+        row - (column_sizes[column] - 1) / 2
+    ])
+
+    # Same rescaling as nx.rescale_layout
+    xy -= xy.mean(axis=0)
+    limit = np.abs(xy).max()
+    if limit > 0:
+        xy *= scale / limit
+
+    positions[:, :2] = xy
+    positions[:, 2] = levels * level_spacing
+    return positions
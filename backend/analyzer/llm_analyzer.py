@@ -0,0 +1,251 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from . import LLM_BATCH_MAX_WAIT, LLM_BATCH_SIZE, LLM_BATCH_TOKEN_BUDGET, LLM_MODEL, LLM_SUMMARY_TOKENS
+from .analysis_cache import AnalysisCache, analysis_key, get_analysis_cache
+from .http_client import http_client
+from .scheduler import RequestFailed, RequestScheduler, scheduler as shared_scheduler
+
+logger = logging.getLogger(__name__)
+
+CHAT_COMPLETIONS_URL = 'https://api.openai.com/v1/chat/completions'
+
+# Rough size of a token in characters of code or English, used for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Names listed per commit before the rest are only counted
+MAX_LISTED_FILES = 50
+
+TRUNCATION_MARK = '\n[...]'
+
+SYSTEM_PROMPT = (
+    "You summarize git commits. For each commit below, write a concise summary of its code changes. "
+    "Reply with a JSON object that maps each commit's number (as a string, such as \"1\") to its summary, "
+    "and nothing else."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def fair_shares(sizes: List[int], budget: int) -> List[int]:
+    """
+    Splits budget across items of the given sizes so that no item gets more
+    than it needs and what small items leave over goes to the larger ones
+    (max-min fairness): items under the fair share are kept whole, and the
+    rest are cut to the same length.
+    """
+    shares = [0] * len(sizes)
+    remaining = max(0, budget)
+    order = sorted(range(len(sizes)), key=sizes.__getitem__)
+    for position, index in enumerate(order):
+        share = min(sizes[index], remaining // (len(order) - position))
+        shares[index] = share
+        remaining -= share
+    return shares
+
+
+def _truncate(text: str, limit: int) -> str:
+    """Cuts text to about limit characters, at a line boundary when there is one nearby"""
+    if len(text) <= limit:
+        return text
+    cut = text.rfind('\n', 0, limit)
+    if cut < limit // 2:
+        cut = limit
+    return text[:cut] + TRUNCATION_MARK
+
+
+@dataclass
+class _PendingCommit:
+    sha: str
+    key: str
+    files: List[Dict]
+    tokens: int
+    future: asyncio.Future
+
+
+class BatchedCommitAnalyzer:
+    """
+    Summarizes commit changes with an LLM, several commits per request.
+
+    analyze() callers are gathered into micro-batches: a batch is sent when it
+    holds batch_size commits, when the next commit would take it over
+    token_budget, or max_wait seconds after its first commit arrived. Each
+    request asks for a JSON object of summaries keyed by per-batch commit ids,
+    which are mapped back to SHAs; commits missing from a reply are retried on
+    their own.
+
+    Summaries are cached by the content of the change (see analysis_key), so a
+    change seen before, in any repository, is never sent again; identical
+    changes waiting at the same time share one request.
+
+    Patches are cut to fit the budget fairly: the budget is first shared among
+    the commits of a batch and then among the files of each commit, so small
+    changes are sent whole and only the largest ones are truncated.
+    """
+
+    def __init__(self, api_key: str, scheduler: Optional[RequestScheduler] = None, model: str = LLM_MODEL,
+                 batch_size: int = LLM_BATCH_SIZE, token_budget: int = LLM_BATCH_TOKEN_BUDGET,
+                 max_wait: float = LLM_BATCH_MAX_WAIT, summary_tokens: int = LLM_SUMMARY_TOKENS,
+                 cache: Optional[AnalysisCache] = None):
+        self.api_key = api_key
+        self.cache = cache or get_analysis_cache()
+        self.scheduler = scheduler or shared_scheduler
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.token_budget = token_budget
+        self.max_wait = max_wait
+        self.summary_tokens = summary_tokens
+        self.requests = 0
+        self._pending: List[_PendingCommit] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def analyze(self, sha: str, files: List[Dict]) -> str:
+        """
+        Returns a summary of a commit's changed files.
+
+        Raises:
+            RequestFailed: If the batch the commit was sent in fails
+        """
+        key = analysis_key(files, self.model)
+        summary = await asyncio.to_thread(self.cache.get, key)
+        if summary is not None:
+            return summary
+        if key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+
+        loop = asyncio.get_running_loop()
+        tokens = sum(estimate_tokens(f.get('patch') or '') + estimate_tokens(f['filename']) for f in files)
+        if self._pending and self._pending_tokens + tokens > self.token_budget:
+            self._flush()
+
+        pending = _PendingCommit(sha, key, files, tokens, loop.create_future())
+        self._in_flight[key] = pending.future
+        pending.future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        self._pending.append(pending)
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await asyncio.shield(pending.future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if batch:
+            self._spawn(batch)
+
+    def _spawn(self, batch: List[_PendingCommit]):
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[_PendingCommit]):
+        batch = [p for p in batch if not p.future.done()]
+        if not batch:
+            return
+        try:
+            summaries = await self._request(batch)
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        for pending in batch:
+            summary = summaries.get(pending.sha)
+            if pending.future.done():
+                continue
+            if summary is not None:
+                # Stored before waiters are released, so that the same change arriving next finds it cached
+                await asyncio.to_thread(self.cache.put, pending.key, summary)
+                if not pending.future.done():
+                    pending.future.set_result(summary)
+            else:
+                logger.warning(f"No summary for commit {pending.sha[:7]} in batched reply, retrying it alone")
+                self._spawn([pending])
+
+    def _prompt(self, batch: List[_PendingCommit]) -> str:
+        overhead = [
+            sum(estimate_tokens(f['filename']) for f in p.files[:MAX_LISTED_FILES]) + 20 for p in batch
+        ]
+        patch_budget = (self.token_budget - estimate_tokens(SYSTEM_PROMPT) - sum(overhead)) * CHARS_PER_TOKEN
+        commit_shares = fair_shares([sum(len(f.get('patch') or '') for f in p.files) for p in batch], patch_budget)
+
+        sections = []
+        for number, (pending, share) in enumerate(zip(batch, commit_shares), start=1):
+            names = [f['filename'] for f in pending.files]
+            listed = ', '.join(names[:MAX_LISTED_FILES])
+            if len(names) > MAX_LISTED_FILES:
+                listed += f' and {len(names) - MAX_LISTED_FILES} more'
+
+            patched = [f for f in pending.files if f.get('patch')]
+            file_shares = fair_shares([len(f['patch']) for f in patched], share)
+            changes = '\n'.join(
+                f"--- {f['filename']}\n{_truncate(f['patch'], limit)}"
+                for f, limit in zip(patched, file_shares) if limit > 0
+            )
+            sections.append(f"## Commit {number}\nFiles modified: {listed}\nChanges:\n{changes or 'No changes available'}")
+        return '\n\n'.join(sections)
+
+    async def _request(self, batch: List[_PendingCommit]) -> Dict[str, str]:
+        """
+        Sends one batch and returns the summaries it got back, by SHA.
+
+        Raises:
+            RequestFailed: If the request fails or the reply carries no message content
+        """
+        self.requests += 1
+        result = await self.scheduler.request_json(
+            http_client.session(),
+            'POST',
+            CHAT_COMPLETIONS_URL,
+            headers={
+                'Authorization': f'Bearer {self.api_key}',
+                'Content-Type': 'application/json'
+            },
+            json={
+                'model': self.model,
+                'messages': [
+                    {'role': 'system', 'content': SYSTEM_PROMPT},
+                    {'role': 'user', 'content': self._prompt(batch)}
+                ],
+                'temperature': 0.7,
+                'max_tokens': self.summary_tokens * len(batch) + 50
+            }
+        )
+        try:
+            content = result['choices'][0]['message']['content'].strip()
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            # Refusals and content-filtered replies come back as 200 without usable content
+            raise RequestFailed(CHAT_COMPLETIONS_URL, 200, f'Unexpected reply shape ({e!r}): {str(result)[:200]}')
+
+        try:
+            # Models sometimes wrap JSON in a code fence
+            replies = json.loads(content.strip('`').removeprefix('json').strip())
+        except ValueError:
+            replies = None
+        if not isinstance(replies, dict):
+            # A lone commit's reply is its summary, whatever its shape
+            return {batch[0].sha: content} if len(batch) == 1 else {}
+
+        summaries = {}
+        for number, pending in enumerate(batch, start=1):
+            summary = replies.get(str(number), replies.get(f'Commit {number}'))
+            if summary is None and len(batch) == 1 and len(replies) == 1:
+                summary = next(iter(replies.values()))
+            if summary is not None:
+                summaries[pending.sha] = summary if isinstance(summary, str) else json.dumps(summary)
+        if len(batch) == 1 and not summaries:
+            summaries[batch[0].sha] = content
+        return summaries
@@ -0,0 +1,61 @@
+import numpy as np
+from typing import Tuple
+
+from .commit_graph import CommitGraph
+
+
+def collapse_chains(graph: CommitGraph) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Groups commits into maximal linear chains.
+
+    A commit continues its parent's chain when it has exactly one parent and is
+    that parent's only child; every other commit starts a new chain. Chain heads
+    are found by pointer jumping, so the pass takes O(n log n) vectorized work
+    instead of a walk per chain.
+
+    Returns:
+        Tuple: (chain id per commit ordinal, head ordinal per chain id). Chain ids
+        follow the order of their heads' ordinals.
+    """
+    n = len(graph)
+    if n == 0:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+
+    in_degree = graph.in_degree()
+    out_degree = graph.out_degree()
+    continues = in_degree == 1
+    single_parent = np.zeros(n, dtype=np.int32)
+    single_parent[continues] = graph.parent_index[graph.parent_offsets[:-1][continues]]
+    continues[continues] = out_degree[single_parent[continues]] == 1
+
+    head = np.where(continues, single_parent, np.arange(n, dtype=np.int32))
+    while True:
+        jumped = head[head]
+        if np.array_equal(jumped, head):
+            break
+        head = jumped
+
+    heads, chain_of = np.unique(head, return_inverse=True)
+    return chain_of.reshape(-1).astype(np.int32), heads.astype(np.int32)
+
+
+def chain_edges(graph: CommitGraph, chain_of: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the (parent chain, child chain) pairs linking distinct chains, one per
+    pair even when several commit edges connect the same two chains.
+    """
+    parents, children = graph.edges()
+    sources, targets = chain_of[parents], chain_of[children]
+    between = sources != targets
+    pairs = np.unique(np.column_stack([sources[between], targets[between]]), axis=0)
+    return pairs[:, 0].astype(np.int32), pairs[:, 1].astype(np.int32)
+
+
+def chain_graph(graph: CommitGraph, chain_of: np.ndarray, heads: np.ndarray) -> CommitGraph:
+    """Builds the DAG of chains, using the hex SHA of each chain's head as its id"""
+    sources, targets = chain_edges(graph, chain_of)
+    head_shas = [graph.sha(head) for head in heads.tolist()]
+    parents = [[] for _ in head_shas]
+    for source, target in zip(sources.tolist(), targets.tolist()):
+        parents[target].append(head_shas[source])
+    return CommitGraph.from_commits(zip(head_shas, parents))
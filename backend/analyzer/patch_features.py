@@ -0,0 +1,146 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from . import PATCH_POOL_THRESHOLD, PATCH_POOL_WORKERS, PATCH_TOP_CHANGES
+from .diff_parser import parse_diff
+
+# Longest changed line kept in top_changes, in characters
+MAX_CHANGE_LENGTH = 200
+
+LANGUAGES = {
+    '.py': 'Python', '.pyi': 'Python', '.ipynb': 'Jupyter Notebook',
+    '.js': 'JavaScript', '.jsx': 'JavaScript', '.mjs': 'JavaScript', '.cjs': 'JavaScript',
+    '.ts': 'TypeScript', '.tsx': 'TypeScript',
+    '.java': 'Java', '.kt': 'Kotlin', '.kts': 'Kotlin', '.scala': 'Scala', '.groovy': 'Groovy',
+    '.c': 'C', '.h': 'C', '.cc': 'C++', '.cpp': 'C++', '.cxx': 'C++', '.hpp': 'C++', '.hh': 'C++',
+    '.cs': 'C#', '.go': 'Go', '.rs': 'Rust', '.swift': 'Swift', '.m': 'Objective-C', '.mm': 'Objective-C',
+    '.rb': 'Ruby', '.php': 'PHP', '.pl': 'Perl', '.lua': 'Lua', '.r': 'R', '.jl': 'Julia',
+    '.dart': 'Dart', '.ex': 'Elixir', '.exs': 'Elixir', '.erl': 'Erlang', '.hs': 'Haskell',
+    '.clj': 'Clojure', '.ml': 'OCaml', '.fs': 'F#', '.zig': 'Zig', '.sol': 'Solidity',
+    '.sh': 'Shell', '.bash': 'Shell', '.zsh': 'Shell', '.ps1': 'PowerShell',
+    '.sql': 'SQL', '.html': 'HTML', '.htm': 'HTML', '.css': 'CSS', '.scss': 'SCSS', '.sass': 'SCSS',
+    '.less': 'Less', '.vue': 'Vue', '.svelte': 'Svelte',
+    '.json': 'JSON', '.yaml': 'YAML', '.yml': 'YAML', '.toml': 'TOML', '.xml': 'XML', '.ini': 'INI',
+    '.md': 'Markdown', '.rst': 'reStructuredText', '.txt': 'Text', '.proto': 'Protocol Buffers',
+    '.tf': 'HCL', '.gradle': 'Gradle', '.cmake': 'CMake'
+}
+
+FILENAME_LANGUAGES = {
+    'Dockerfile': 'Dockerfile', 'Makefile': 'Makefile', 'CMakeLists.txt': 'CMake',
+    'Gemfile': 'Ruby', 'Rakefile': 'Ruby', 'Jenkinsfile': 'Groovy'
+}
+
+
+def detect_language(filename: str) -> str:
+    """Guesses a file's language from its name"""
+    name = os.path.basename(filename)
+    if name in FILENAME_LANGUAGES:
+        return FILENAME_LANGUAGES[name]
+    return LANGUAGES.get(os.path.splitext(name)[1].lower(), 'Other')
+
+
+@dataclass
+class FileFeatures:
+    """Change statistics of one file in a commit"""
+    filename: str
+    status: str
+    language: str
+    additions: int
+    deletions: int
+    hunks: int
+    previous_filename: Optional[str] = None
+    # First changed lines with text, as ('+' or '-', line)
+    top_changes: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def churn(self) -> int:
+        return self.additions + self.deletions
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), 'churn': self.churn}
+
+
+def extract_file_features(file: Dict, top_n: int = PATCH_TOP_CHANGES) -> FileFeatures:
+    """
+    Computes the features of one file entry of a commit detail (as returned
+    by the REST API or LocalGitSource). The patch is indexed once as bytes;
+    changed lines are only decoded until top_n of them have been collected.
+    """
+    patch = (file.get('patch') or '').encode('utf-8')
+    index = parse_diff(patch) if patch else None
+    hunks = [hunk for entry in index for hunk in entry.hunks] if index else []
+
+    top_changes = []
+    for hunk in hunks:
+        # Walk the lines after the @@ header one at a time, stopping as soon as enough were found
+        newline = patch.find(b'\n', hunk.start, hunk.end)
+        while newline != -1 and len(top_changes) < top_n:
+            start = newline + 1
+            newline = patch.find(b'\n', start, hunk.end)
+            line = patch[start:hunk.end if newline == -1 else newline]
+            text = line[1:].strip()
+            if line[:1] in (b'+', b'-') and text:
+                top_changes.append((line[:1].decode(), text[:MAX_CHANGE_LENGTH].decode('utf-8', errors='replace')))
+        if len(top_changes) >= top_n:
+            break
+
+    filename = file.get('filename', 'unknown')
+    return FileFeatures(
+        filename=filename,
+        status=file.get('status', 'modified'),
+        language=detect_language(filename),
+        # The API's counts cover patches it truncated; the parsed ones are the fallback
+        additions=file.get('additions', sum(h.additions for h in hunks)),
+        deletions=file.get('deletions', sum(h.deletions for h in hunks)),
+        hunks=len(hunks),
+        previous_filename=file.get('previous_filename'),
+        top_changes=top_changes
+    )
+
+
+def extract_features(files: List[Dict], top_n: int = PATCH_TOP_CHANGES) -> List[FileFeatures]:
+    return [extract_file_features(file, top_n) for file in files]
+
+
+def summarize_languages(features: List[FileFeatures]) -> Dict[str, int]:
+    """Churn per language, largest first"""
+    churn: Dict[str, int] = {}
+    for file in features:
+        churn[file.language] = churn.get(file.language, 0) + file.churn
+    return dict(sorted(churn.items(), key=lambda item: -item[1]))
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PATCH_POOL_WORKERS)
+    return _pool
+
+
+def shutdown_pool():
+    """Stops the worker processes, if any were started"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+async def analyze_patches(files: List[Dict], top_n: int = PATCH_TOP_CHANGES,
+                          threshold: int = PATCH_POOL_THRESHOLD) -> List[FileFeatures]:
+    """
+    Extracts the features of a commit's files. Small commits are handled
+    inline; commits with more than threshold bytes of patches go to the
+    process pool so that they do not hold up the event loop.
+    """
+    if sum(len(file.get('patch') or '') for file in files) <= threshold:
+        return extract_features(files, top_n)
+    # Only what extraction reads is sent to the worker process
+    keys = ('filename', 'status', 'patch', 'additions', 'deletions', 'previous_filename')
+    slim = [{key: file[key] for key in keys if key in file} for file in files]
+    return await asyncio.get_running_loop().run_in_executor(_get_pool(), extract_features, slim, top_n)
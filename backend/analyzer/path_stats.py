@@ -0,0 +1,87 @@
+from typing import Any, Dict
+
+from .commit_graph import CommitGraph
+
+
+def branch_path_stats(graph: CommitGraph) -> Dict[str, Any]:
+    """
+    Statistics over all root-to-leaf paths, computed without enumerating them.
+
+    One dynamic-programming pass in topological order carries, for every commit,
+    the number of paths reaching it from a root and the summed length of those
+    paths; a child inherits its parents' counts, and each path gets one node
+    longer. Leaves (commits without children) then hold the totals. Lengths are
+    counted in commits, so an isolated commit is a path of length 1.
+
+    Counts are exact Python integers, as they grow exponentially with merges.
+
+    Returns:
+        Dict: path_count, total_length, average_length and longest_length
+    """
+    n = len(graph)
+    if n == 0:
+        return {'path_count': 0, 'total_length': 0, 'average_length': 0, 'longest_length': 0}
+
+    parent_starts = graph.parent_offsets.tolist()
+    parents = graph.parent_index.tolist()
+    counts = [0] * n
+    length_sums = [0] * n
+
+    for node in graph.topological_order().tolist():
+        start, end = parent_starts[node], parent_starts[node + 1]
+        if start == end:
+            counts[node] = 1
+            length_sums[node] = 1
+            continue
+        count = length_sum = 0
+        for parent in parents[start:end]:
+            count += counts[parent]
+            length_sum += length_sums[parent]
+        counts[node] = count
+        length_sums[node] = length_sum + count
+
+    leaves = (graph.out_degree() == 0).nonzero()[0].tolist()
+    path_count = sum(counts[leaf] for leaf in leaves)
+    total_length = sum(length_sums[leaf] for leaf in leaves)
+
+    return {
+        'path_count': path_count,
+        'total_length': total_length,
+        'average_length': total_length / path_count if path_count else 0,
+        # The generation of a commit is the length of the longest path reaching it
+        'longest_length': int(graph.generation.max())
+    }
+
+
+def max_root_distance(graph: CommitGraph) -> int:
+    """
+    The largest number of edges on a shortest path from a root to any commit
+    it reaches, i.e. the deepest breadth-first level below any root.
+
+    Each root is searched separately over the CSR child lists; repositories
+    seldom have more than a handful of roots.
+    """
+    n = len(graph)
+    if n == 0:
+        return 0
+
+    child_starts = graph.child_offsets.tolist()
+    children = graph.child_index.tolist()
+    deepest = 0
+    for root in (graph.in_degree() == 0).nonzero()[0].tolist():
+        seen = bytearray(n)
+        seen[root] = 1
+        frontier = [root]
+        depth = 0
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for child in children[child_starts[node]:child_starts[node + 1]]:
+                    if not seen[child]:
+                        seen[child] = 1
+                        next_frontier.append(child)
+            if next_frontier:
+                depth += 1
+            frontier = next_frontier
+        deepest = max(deepest, depth)
+    return deepest
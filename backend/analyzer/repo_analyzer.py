@@ -3,7 +3,16 @@ from datetime import datetime
 import aiohttp
 import asyncio
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Callable, List, Dict, Optional, Tuple
+
+from . import GITHUB_PAGE_SIZE, MAX_COMMIT_LIMIT, MAX_PENDING_COMMITS
+from .commit_cache import CommitCache, get_commit_cache
+from .git_source import LocalGitSource
+from .graphql_source import GraphQLCommitSource
+from .http_client import http_client
+from .llm_analyzer import BatchedCommitAnalyzer
+from .patch_features import analyze_patches, summarize_languages
+from .scheduler import RequestFailed, scheduler
 
 @dataclass
 class CommitNode:
@@ -18,8 +27,35 @@ class CommitNode:
     files_count: int
     is_initial: bool
 
+class CommitListNotModified(Exception):
+    """Raised when a conditional commit-list request comes back 304 Not Modified"""
+
+# Where commit history is ingested from
+COMMIT_SOURCES = ('rest', 'graphql', 'local')
+
+# Fields of a listed commit that its analysis reads
+DETAIL_KEYS = ('sha', 'url', 'files_count', 'files_changed', 'stats')
+
+def graph_to_json(graph: nx.DiGraph) -> Dict:
+    """Serializes a commit graph into JSON-compatible nodes and edges"""
+    nodes = []
+    for sha, data in graph.nodes(data=True):
+        data = dict(data)
+        data['date'] = data['date'].isoformat()
+        nodes.append([sha, data])
+    return {'nodes': nodes, 'edges': list(graph.edges())}
+
+def graph_from_json(data: Dict) -> nx.DiGraph:
+    """Rebuilds a commit graph serialized by graph_to_json"""
+    graph = nx.DiGraph(failed_commits={})
+    for sha, attrs in data['nodes']:
+        attrs['date'] = datetime.fromisoformat(attrs['date'])
+        graph.add_node(sha, **attrs)
+    graph.add_edges_from(data['edges'])
+    return graph
+
 class RepositoryAnalyzer:
-    def __init__(self, github_token: str, openai_key: str):
+    def __init__(self, github_token: str, openai_key: str, commit_cache: Optional[CommitCache] = None):
         self.github_token = github_token
         self.openai_key = openai_key
         self.headers = {
@@ -27,107 +63,335 @@ class RepositoryAnalyzer:
             'Accept': 'application/vnd.github+json'
         }
         self.commit_graph = nx.DiGraph()
+        self.scheduler = scheduler
+        self.llm = BatchedCommitAnalyzer(openai_key, self.scheduler)
+        self.failed_commits: Dict[str, str] = {}
+        self.commit_cache = commit_cache or get_commit_cache()
+        self.owner = None
+        self.repo = None
+        self.list_validators: Optional[Tuple[Optional[str], Optional[str]]] = None
+        self.source = 'rest'
+        self.analyze_changes = True
+        self.git_source: Optional[LocalGitSource] = None
+        self.progress: Optional[Callable[[Dict], None]] = None
+        self.on_listed: Optional[Callable[[nx.DiGraph], None]] = None
+        self.on_commit: Optional[Callable[[str, Dict], None]] = None
+        self.commits_discovered = 0
+        self.commits_analyzed = 0
+
+    async def _fetch_commit_page(self, session: aiohttp.ClientSession, url: str,
+                                 result_key: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Fetches one page of commit history and the URL of the next page, if any.
+        With a result_key, the request is made conditional on the ETag/Last-Modified
+        stored for that result and raises CommitListNotModified on a 304.
+        """
+        headers = dict(self.headers)
+        if result_key:
+            validators = await asyncio.to_thread(self.commit_cache.get_validators, result_key)
+            if validators:
+                etag, last_modified = validators
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+
+        async def read_page(response: aiohttp.ClientResponse) -> Tuple[List[Dict], Optional[str]]:
+            if response.status == 304:
+                raise CommitListNotModified(url)
+            if result_key:
+                self.list_validators = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            next_link = response.links.get('next')
+            return await response.json(), str(next_link['url']) if next_link else None
+
+        try:
+            return await self.scheduler.request(session, 'GET', url, read_page, headers=headers)
+        except RequestFailed as e:
+            raise Exception(f'Failed to fetch commits: {e}')
+
+    async def _iter_commits(self, session: aiohttp.ClientSession, owner: str, repo: str, limit: int,
+                            result_key: Optional[str] = None) -> AsyncIterator[Dict]:
+        """
+        Streams commit history from GitHub API, following Link: rel="next" pages.
+        The next page is requested before the current one is handed out, so
+        consumers can work on page N while page N+1 is in flight. The first page
+        is requested conditionally when a result_key is given.
+        """
+        remaining = max(0, min(limit, MAX_COMMIT_LIMIT))
+        if remaining == 0:
+            return
+
+        url = f'https://api.github.com/repos/{owner}/{repo}/commits?per_page={min(remaining, GITHUB_PAGE_SIZE)}'
+        next_page = asyncio.ensure_future(self._fetch_commit_page(session, url, result_key))
+        try:
+            while next_page is not None:
+                commits, next_url = await next_page
+                next_page = None
+                if next_url and len(commits) < remaining:
+                    next_page = asyncio.ensure_future(self._fetch_commit_page(session, next_url))
 
-    async def _fetch_commits(self, session: aiohttp.ClientSession, owner: str, repo: str, limit: int) -> List[Dict]:
-        """Fetches commit history from GitHub API"""
-        url = f'https://api.github.com/repos/{owner}/{repo}/commits?per_page={limit}'
-        async with session.get(url, headers=self.headers) as response:
-            if response.status != 200:
-                error_data = await response.text()
-                raise Exception(f'Failed to fetch commits: {error_data}')
-            return await response.json()
+                for commit in commits[:remaining]:
+                    yield commit
+                remaining -= min(len(commits), remaining)
+        finally:
+            if next_page is not None and not next_page.done():
+                next_page.cancel()
 
-    async def analyze_repository(self, owner: str, repo: str, limit: int = 50) -> nx.DiGraph:
+    def _add_commit_node(self, commit: Dict, waiting_children: Dict[str, List[str]]):
+        """
+        Adds a commit to the graph and links it to any parents and children already seen.
+        Commits arrive newest first, so edges to parents that have not been seen yet are
+        parked in waiting_children until the parent shows up.
+        """
+        sha = commit['sha']
+        parent_shas = [p['sha'] for p in commit['parents']]
+
+        self.commit_graph.add_node(sha,
+            message=commit['commit']['message'],
+            author=commit['commit']['author']['name'],
+            date=datetime.fromisoformat(commit['commit']['author']['date'].replace('Z', '+00:00')),
+            is_initial=len(parent_shas) == 0
+        )
+
+        # Add edges from parents to this commit (only for parents within our commit window)
+        for parent_sha in parent_shas:
+            if parent_sha in self.commit_graph:
+                self.commit_graph.add_edge(parent_sha, sha)
+            else:
+                waiting_children.setdefault(parent_sha, []).append(sha)
+
+        for child_sha in waiting_children.pop(sha, []):
+            self.commit_graph.add_edge(sha, child_sha)
+
+    async def fetch_head_sha(self, owner: str, repo: str, source: str = 'rest',
+                             repo_path: Optional[str] = None) -> str:
+        """
+        Returns the SHA at the tip of the history that analyze_repository would
+        read, with one small request (the commit SHA media type returns just the
+        40 hex characters) or, for local sources, one git rev-parse.
+        """
+        if source == 'local':
+            git_source = LocalGitSource(repo_path) if repo_path else LocalGitSource.for_mirror(owner, repo)
+            return await git_source.head_sha()
+
+        async def read_sha(response: aiohttp.ClientResponse) -> str:
+            return (await response.text()).strip()
+
+        headers = dict(self.headers, Accept='application/vnd.github.sha')
+        return await self.scheduler.request(
+            http_client.session(), 'GET', f'https://api.github.com/repos/{owner}/{repo}/commits/HEAD', read_sha, headers=headers
+        )
+
+    async def analyze_repository(self, owner: str, repo: str, limit: int = 50,
+                                 source: str = 'rest', analyze_changes: bool = True,
+                                 repo_path: Optional[str] = None,
+                                 progress: Optional[Callable[[Dict], None]] = None,
+                                 on_listed: Optional[Callable[[nx.DiGraph], None]] = None,
+                                 on_commit: Optional[Callable[[str, Dict], None]] = None) -> nx.DiGraph:
         """
         Analyzes a repository and builds a directed graph of commits.
         Returns a NetworkX DiGraph representing the commit history.
+
+        source selects how history is ingested: 'rest' lists commits through the
+        REST API, 'graphql' fetches topology and change stats 100 commits per call,
+        and 'local' reads a clone at repo_path (or the mirror under GIT_MIRROR_ROOT)
+        without touching the network. With analyze_changes off, no patches are
+        needed, so GraphQL and local commits skip the per-commit detail fetch and
+        the LLM analysis entirely.
+
+        progress, if given, is called with a dict of counters (stage,
+        commits_discovered, commits_analyzed, commits_failed) as commits are
+        discovered and analyzed.
+
+        on_listed, if given, is called with the graph once every commit has been
+        listed and linked, while their details and analyses may still be
+        pending; on_commit is then called with each commit's SHA and node
+        attributes as soon as that commit has been analyzed.
         """
+        if source not in COMMIT_SOURCES:
+            raise ValueError(f"Unknown commit source '{source}', expected one of {', '.join(COMMIT_SOURCES)}")
+        if source == 'local':
+            self.git_source = LocalGitSource(repo_path) if repo_path else LocalGitSource.for_mirror(owner, repo)
+
+        result_key = f'{owner}/{repo}?limit={limit}&analyze={int(analyze_changes)}'.lower()
+        self.progress = progress
+        self.on_listed, self.on_commit = on_listed, on_commit
         try:
-            async with aiohttp.ClientSession() as session:
-                # Reset the graph for new analysis
-                self.commit_graph = nx.DiGraph()
-                
-                # Fetch commits
-                commits = await self._fetch_commits(session, owner, repo, limit)
-                
-                if not commits:
-                    print(f"No commits found for repository {owner}/{repo}")
-                    return self.commit_graph
-                
-                # Build initial graph structure
-                for commit in commits:
-                    sha = commit['sha']
-                    parent_shas = [p['sha'] for p in commit['parents']]
-                    
-                    # Add nodes and edges
-                    self.commit_graph.add_node(sha, 
-                        message=commit['commit']['message'],
-                        author=commit['commit']['author']['name'],
-                        date=datetime.fromisoformat(commit['commit']['author']['date'].replace('Z', '+00:00')),
-                        is_initial=len(parent_shas) == 0
-                    )
-                    
-                    # Add edges from parents to this commit
-                    for parent_sha in parent_shas:
-                        if parent_sha in [c['sha'] for c in commits]:  # Only add edge if parent is in our commit list
-                            self.commit_graph.add_edge(parent_sha, sha)
-                
-                # Fetch detailed commit data and analyze in parallel
-                await self._analyze_commits(session, commits)
-                
-                return self.commit_graph
-                
+            session = http_client.session()
+            # An unchanged commit list (304) is answered with the previously built graph;
+            # if that result has gone missing, retry unconditionally
+            for conditional in (True, False):
+                self._reset_graph(owner, repo)
+                self.source, self.analyze_changes = source, analyze_changes
+                try:
+                    # Build the graph as pages arrive while commit details are fetched alongside
+                    if source == 'graphql':
+                        commits = GraphQLCommitSource(self.headers, self.scheduler).iter_commits(session, owner, repo, limit)
+                    elif source == 'local':
+                        commits = self.git_source.iter_commits(limit)
+                    else:
+                        commits = self._iter_commits(session, owner, repo, limit, result_key if conditional else None)
+                    await self._analyze_commits(session, commits)
+                    break
+                except CommitListNotModified:
+                    previous = await asyncio.to_thread(self.commit_cache.get_result, result_key)
+                    if previous is not None:
+                        print(f"Repository {owner}/{repo} unchanged, reusing previous analysis")
+                        self.commit_graph = graph_from_json(previous)
+                        self.commits_discovered = self.commits_analyzed = self.commit_graph.number_of_nodes()
+                        self._report_progress('done')
+                        return self.commit_graph
+
+            if self.commit_graph.number_of_nodes() == 0:
+                print(f"No commits found for repository {owner}/{repo}")
+            elif self.list_validators and not self.failed_commits:
+                etag, last_modified = self.list_validators
+                await asyncio.to_thread(
+                    self.commit_cache.put_result, result_key, etag, last_modified, graph_to_json(self.commit_graph)
+                )
+
+            self._report_progress('done')
+            return self.commit_graph
+
         except Exception as e:
             print(f"Error analyzing repository: {str(e)}")
             return nx.DiGraph()  # Return empty graph on error
 
-    async def _analyze_commits(self, session: aiohttp.ClientSession, commits: List[Dict]):
-        """Analyzes commits in parallel using asyncio"""
-        tasks = [self._analyze_single_commit(session, commit) for commit in commits]
-        await asyncio.gather(*tasks)
+    def _reset_graph(self, owner: str, repo: str):
+        """Starts a fresh graph for a new analysis"""
+        self.commit_graph = nx.DiGraph()
+        self.failed_commits = {}
+        self.commit_graph.graph['failed_commits'] = self.failed_commits
+        self.owner, self.repo = owner, repo
+        self.list_validators = None
+        self.commits_discovered = 0
+        self.commits_analyzed = 0
+
+    def _report_progress(self, stage: str = 'analyzing'):
+        """Passes the current commit counters to the progress callback, if any"""
+        if self.progress:
+            self.progress({
+                'stage': stage,
+                'commits_discovered': self.commits_discovered,
+                'commits_analyzed': self.commits_analyzed,
+                'commits_failed': len(self.failed_commits)
+            })
+
+    async def _analyze_commits(self, session: aiohttp.ClientSession, commits: AsyncIterator[Dict]):
+        """
+        Adds streamed commits to the graph, then analyzes them concurrently.
+
+        The whole (limit-bounded) listing is read first, so on_listed gets the
+        complete topology as soon as the last page arrives rather than after
+        earlier commits have been analyzed. Only what the analysis needs is
+        kept of each listed commit. At most MAX_PENDING_COMMITS analyses are
+        in flight at once.
+        """
+        waiting_children: Dict[str, List[str]] = {}
+        listed: List[Dict] = []
+        async for commit in commits:
+            self._add_commit_node(commit, waiting_children)
+            listed.append({key: commit[key] for key in DETAIL_KEYS if key in commit})
+            self.commits_discovered += 1
+            self._report_progress()
+
+        # The topology is complete; only details and analyses are still to come
+        if self.on_listed:
+            self.on_listed(self.commit_graph)
+
+        window = asyncio.Semaphore(MAX_PENDING_COMMITS)
+        tasks = set()
+
+        async def analyze(commit: Dict):
+            try:
+                await self._analyze_single_commit(session, commit)
+                self.commits_analyzed += 1
+                self._report_progress()
+                if self.on_commit:
+                    self.on_commit(commit['sha'], self.commit_graph.nodes[commit['sha']])
+            finally:
+                window.release()
+
+        try:
+            for commit in listed:
+                await window.acquire()
+                task = asyncio.ensure_future(analyze(commit))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
 
     async def _analyze_single_commit(self, session: aiohttp.ClientSession, commit: Dict):
         """Analyzes a single commit's changes and updates the graph"""
         sha = commit['sha']
-        url = commit['url']
-        
-        async with session.get(url, headers=self.headers) as response:
-            if response.status != 200:
-                return
-            
-            commit_data = await response.json()
+
+        # GraphQL and local sources already supplied the stats; only fetch details when patches are needed
+        if not self.analyze_changes and 'files_count' in commit:
+            self.commit_graph.nodes[sha].update({
+                'files_changed': commit.get('files_changed', []),
+                'files_count': commit['files_count'],
+                'additions': commit['stats']['additions'],
+                'deletions': commit['stats']['deletions'],
+                'analysis': ''
+            })
+            return
+
+        # Any error is kept on the commit's node so that one bad commit does not drop the analysis
+        try:
+            commit_data = await self._fetch_commit_detail(session, commit)
             files = commit_data.get('files', [])
-            
-            # Update node with detailed information
+            stats = commit_data.get('stats', {})
+            features = await analyze_patches(files)
+        except Exception as e:
+            self._record_failure(sha, f'Failed to fetch commit details: {e}')
             self.commit_graph.nodes[sha].update({
-                'files_changed': [f['filename'] for f in files],
-                'files_count': len(files),
-                'analysis': await self._analyze_with_gpt4(files) if files else "No changes"
+                'files_changed': [],
+                'files_count': 0,
+                'analysis': "Analysis failed"
             })
+            return
 
-    async def _analyze_with_gpt4(self, files: List[Dict]) -> str:
-        """Analyzes file changes using GPT-4"""
-        patches = [f.get('patch', 'No changes available')[:1000] for f in files]
-        prompt = f"Analyze this code change briefly:\nFiles modified: {', '.join(f['filename'] for f in files)}\nChanges: {' '.join(patches)}\nProvide a concise summary."
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers={
-                    'Authorization': f'Bearer {self.openai_key}',
-                    'Content-Type': 'application/json'
-                },
-                json={
-                    'model': 'gpt-4',
-                    'messages': [{'role': 'user', 'content': prompt}],
-                    'temperature': 0.7,
-                    'max_tokens': 100
-                }
-            ) as response:
-                if response.status != 200:
-                    return "Analysis failed"
-                result = await response.json()
-                return result['choices'][0]['message']['content']
+        # Update node with detailed information
+        self.commit_graph.nodes[sha].update({
+            'files_changed': [f['filename'] for f in files],
+            'files_count': len(files),
+            'additions': stats.get('additions', 0),
+            'deletions': stats.get('deletions', 0),
+            'hunks': sum(f.hunks for f in features),
+            'languages': summarize_languages(features)
+        })
+
+        if not self.analyze_changes:
+            self.commit_graph.nodes[sha]['analysis'] = ''
+            return
+
+        try:
+            analysis = await self.llm.analyze(sha, files) if files else "No changes"
+        except Exception as e:
+            self._record_failure(sha, f'Failed to analyze changes: {e}')
+            analysis = "Analysis failed"
+        self.commit_graph.nodes[sha]['analysis'] = analysis
+
+    async def _fetch_commit_detail(self, session: aiohttp.ClientSession, commit: Dict) -> Dict:
+        """Fetches a commit's files and stats, reading through the SHA-keyed commit cache"""
+        sha = commit['sha']
+        if self.source == 'local':
+            return await self.git_source.fetch_detail(sha)
+
+        commit_data = await asyncio.to_thread(self.commit_cache.get, self.owner, self.repo, sha)
+        if commit_data is None:
+            commit_data = await self.scheduler.request_json(session, 'GET', commit['url'], headers=self.headers)
+            await asyncio.to_thread(self.commit_cache.put, self.owner, self.repo, sha, commit_data)
+        return commit_data
+
+    def _record_failure(self, sha: str, error: str):
+        """Marks a commit as failed without dropping it from the graph"""
+        print(f"Commit {sha[:7]}: {error}")
+        self.failed_commits[sha] = error
+        self.commit_graph.nodes[sha]['error'] = error
 
     def get_tree_structure(self) -> Dict:
         """Converts the graph into a tree structure suitable for visualization"""
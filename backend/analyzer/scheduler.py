@@ -0,0 +1,147 @@
+import aiohttp
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from . import MAX_REQUESTS_PER_HOST, MAX_REQUEST_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Statuses that are worth retrying after a pause
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Below this many remaining requests, calls to a host are spread out until the reset time
+LOW_REMAINING_THRESHOLD = 10
+
+
+class RequestFailed(Exception):
+    """Raised when a request still fails after all retries, or fails in a non-retryable way"""
+
+    def __init__(self, url: str, status: Optional[int], message: str):
+        self.url = url
+        self.status = status
+        super().__init__(f'{status or "network error"} for {url}: {message}')
+
+
+class _HostState:
+    def __init__(self, max_in_flight: int):
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.paused_until = 0.0
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.time() + seconds)
+
+    async def wait(self):
+        delay = self.paused_until - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RequestScheduler:
+    """
+    Issues HTTP requests with a cap on in-flight requests per host.
+    Rate-limit headers (X-RateLimit-Remaining/Reset, Retry-After) pause the
+    whole host, and retryable failures are retried with jittered exponential backoff.
+
+    Host states belong to the event loop they were created in and are started
+    afresh when the scheduler is used from another loop.
+    """
+
+    def __init__(self, max_per_host: int = MAX_REQUESTS_PER_HOST, max_retries: int = MAX_REQUEST_RETRIES,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._hosts: Dict[str, _HostState] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _host(self, url: str) -> _HostState:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Semaphores cannot be shared between event loops
+            self._hosts = {}
+            self._loop = loop
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(self.max_per_host)
+        return self._hosts[host]
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _observe_rate_limit(self, state: _HostState, response: aiohttp.ClientResponse):
+        """Pauses the host according to the rate-limit headers of a response"""
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                state.pause(float(retry_after))
+            except ValueError:
+                pass
+
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining, reset = int(remaining), float(reset)
+        except ValueError:
+            return
+
+        until_reset = max(0.0, reset - time.time())
+        if remaining == 0:
+            logger.warning(f"Rate limit exhausted, pausing for {until_reset:.0f}s")
+            state.pause(until_reset)
+        elif remaining < LOW_REMAINING_THRESHOLD:
+            state.pause(until_reset / remaining)
+
+    async def request(self, session: aiohttp.ClientSession, method: str, url: str,
+                      reader: Callable[[aiohttp.ClientResponse], Awaitable[Any]], **kwargs) -> Any:
+        """
+        Performs a request and returns reader(response) for any status below 400.
+
+        Raises:
+            RequestFailed: If the request fails with a non-retryable status or retries run out
+        """
+        state = self._host(url)
+        for attempt in range(self.max_retries + 1):
+            async with state.semaphore:
+                await state.wait()
+                try:
+                    async with session.request(method, url, **kwargs) as response:
+                        self._observe_rate_limit(state, response)
+                        if response.status < 400:
+                            return await reader(response)
+
+                        message = await response.text()
+                        # GitHub reports secondary rate limits as 403
+                        rate_limited = response.status == 403 and (
+                            'Retry-After' in response.headers
+                            or response.headers.get('X-RateLimit-Remaining') == '0'
+                            or 'rate limit' in message.lower()
+                        )
+                        if response.status not in RETRYABLE_STATUSES and not rate_limited:
+                            raise RequestFailed(url, response.status, message)
+                        error = RequestFailed(url, response.status, message)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = RequestFailed(url, None, str(e))
+
+            if attempt == self.max_retries:
+                raise error
+            delay = self._backoff(attempt)
+            logger.info(f"Retrying {method} {url} in {delay:.1f}s ({error})")
+            await asyncio.sleep(delay)
+
+    async def request_json(self, session: aiohttp.ClientSession, method: str, url: str, **kwargs) -> Any:
+        """Performs a request and returns the decoded JSON body"""
+        async def read_json(response: aiohttp.ClientResponse) -> Any:
+            return await response.json()
+        return await self.request(session, method, url, read_json, **kwargs)
+
+
+# Shared by every analysis, the LLM analyzer and the diff service, so that per-host
+# caps and rate-limit pauses hold for the whole process
+scheduler = RequestScheduler()
@@ -1,6 +1,4 @@
-from .routes import router
-
-__all__ = ['router']
+import os
 
 # API Version
 API_VERSION = '1.0.0'
@@ -9,21 +7,49 @@ API_VERSION = '1.0.0'
 API_PREFIX = '/api/v1'
 
 # Rate limiting settings
-RATE_LIMIT_WINDOW = 3600  # 1 hour in seconds
-RATE_LIMIT_MAX_REQUESTS = 100
+RATE_LIMIT_WINDOW = int(os.getenv('RATE_LIMIT_WINDOW', 3600))  # 1 hour in seconds
+RATE_LIMIT_MAX_REQUESTS = int(os.getenv('RATE_LIMIT_MAX_REQUESTS', 100))
+
+# Admission control: analyses running at once, requests allowed to wait for a slot, and how long they wait
+MAX_CONCURRENT_ANALYSES = int(os.getenv('MAX_CONCURRENT_ANALYSES', 4))
+ANALYSIS_QUEUE_SIZE = int(os.getenv('ANALYSIS_QUEUE_SIZE', 16))
+ANALYSIS_QUEUE_TIMEOUT = float(os.getenv('ANALYSIS_QUEUE_TIMEOUT', 30))
 
 # Cache settings
-CACHE_EXPIRE_TIME = 300  # 5 minutes in seconds
+CACHE_EXPIRE_TIME = int(os.getenv('CACHE_EXPIRE_TIME', 300))  # 5 minutes in seconds
+
+# Analysis result cache: in-process tier and on-disk tier (shared between workers) size limits
+RESULT_CACHE_PATH = os.getenv(
+    'RESULT_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'results.db')
+)
+RESULT_CACHE_MEMORY_BYTES = int(os.getenv('RESULT_CACHE_MEMORY_BYTES', 64 * 1024 * 1024))
+RESULT_CACHE_DISK_BYTES = int(os.getenv('RESULT_CACHE_DISK_BYTES', 256 * 1024 * 1024))
 
 # Error messages
 ERROR_MESSAGES = {
     'invalid_token': 'Invalid or missing authentication token',
     'rate_limit': 'Rate limit exceeded. Please try again later',
+    'overloaded': 'Server is busy with other analyses. Please try again later',
     'server_error': 'Internal server error occurred',
     'not_found': 'Requested resource not found',
     'bad_request': 'Invalid request parameters'
 }
 
+# File diffs larger than this are streamed instead of returned inline as JSON, in chunks of this size
+DIFF_INLINE_MAX_BYTES = int(os.getenv('DIFF_INLINE_MAX_BYTES', 1024 * 1024))
+DIFF_STREAM_CHUNK_BYTES = 64 * 1024
+
+# Analysis jobs: worker count, most jobs waiting in the queue, and how long finished jobs are kept
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', 100))
+JOB_RETENTION_TIME = int(os.getenv('JOB_RETENTION_TIME', 3600))
+
+# Submodules are imported after the constants above, which they use
+from .routes import router
+
+__all__ = ['router']
+
 # Import middleware
 from fastapi import Request
 from fastapi.responses import JSONResponse
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from api import (ANALYSIS_QUEUE_SIZE, ANALYSIS_QUEUE_TIMEOUT, ERROR_MESSAGES, MAX_CONCURRENT_ANALYSES,
+                 RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_WINDOW)
+
+logger = logging.getLogger(__name__)
+
+# Requests that start an analysis: they take a slot in the analysis gate
+HEAVY_ROUTES = (('POST', '/api/v1/analyze'),)
+
+# Requests that spend GitHub or OpenAI quota: they draw a token from the caller's bucket.
+# Everything else (job status, cache stats, config) is never throttled.
+RATE_LIMITED_ROUTES = HEAVY_ROUTES + (('POST', '/api/v1/jobs'), ('POST', '/api/v1/diff'))
+
+# Buckets are dropped once this many callers are tracked; a full bucket is the same as no bucket
+MAX_TRACKED_CALLERS = 10000
+
+
+class AnalysisGateFull(Exception):
+    """Raised when no analysis slot can be had within the wait limits"""
+
+
+def _matches(method: str, path: str, routes: Tuple[Tuple[str, str], ...]) -> bool:
+    return any(method == m and (path == p or path.startswith(p + '/')) for m, p in routes)
+
+
+class TokenBucket:
+    """Holds up to capacity tokens, refilled continuously at rate tokens per second"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Takes a token; returns 0 on success, otherwise the seconds until one is available"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class AnalysisGate:
+    """
+    Caps how many analyses run at once. Up to max_waiting callers may wait for a
+    slot, each for at most timeout seconds; anyone beyond that is turned away
+    straight away rather than piling up on the event loop.
+    """
+
+    def __init__(self, slots: int = MAX_CONCURRENT_ANALYSES, max_waiting: int = ANALYSIS_QUEUE_SIZE,
+                 timeout: float = ANALYSIS_QUEUE_TIMEOUT):
+        self.slots = slots
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.running = 0
+        self.waiting = 0
+        # Moving average of analysis durations, used to suggest when to retry
+        self.average_duration = 30.0
+        self._semaphore = asyncio.Semaphore(slots)
+
+    def retry_after(self) -> int:
+        """Rough number of seconds until a slot frees up for a new caller"""
+        return max(1, math.ceil(self.average_duration * (self.waiting + 1) / self.slots))
+
+    @asynccontextmanager
+    async def slot(self, bounded: bool = True) -> AsyncIterator[None]:
+        """
+        Holds an analysis slot for the duration of the block. Unbounded callers
+        (such as job workers, which have their own queue) wait as long as needed.
+
+        Raises:
+            AnalysisGateFull: If bounded and the wait queue is full or the wait times out
+        """
+        if not self._semaphore.locked():
+            # A free slot is taken without suspending, so concurrent callers see it as gone
+            await self._semaphore.acquire()
+        else:
+            if bounded and self.waiting >= self.max_waiting:
+                raise AnalysisGateFull()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout if bounded else None)
+            except asyncio.TimeoutError:
+                raise AnalysisGateFull()
+            finally:
+                self.waiting -= 1
+
+        self.running += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+            self.average_duration = 0.8 * self.average_duration + 0.2 * (time.monotonic() - started)
+
+    def stats(self) -> Dict[str, float]:
+        return {'slots': self.slots, 'running': self.running, 'waiting': self.waiting,
+                'average_duration': self.average_duration}
+
+
+# Shared by the middleware and the job workers so that the cap covers both
+analysis_gate = AnalysisGate()
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying per-caller rate limits and the global analysis cap.
+
+    Callers are identified by their X-API-Key header, falling back to the client
+    address. Each gets a token bucket of RATE_LIMIT_MAX_REQUESTS tokens refilled
+    over RATE_LIMIT_WINDOW seconds, drawn from by RATE_LIMITED_ROUTES only. Heavy
+    routes also hold an analysis slot until their response has been fully sent.
+    Rejections are immediate: 429 when the bucket is empty and 503 when the
+    analysis queue is full, both with a Retry-After header.
+    """
+
+    def __init__(self, app, gate: Optional[AnalysisGate] = None,
+                 max_requests: int = RATE_LIMIT_MAX_REQUESTS, window: float = RATE_LIMIT_WINDOW):
+        self.app = app
+        self.gate = gate or analysis_gate
+        self.max_requests = max_requests
+        self.window = window
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def _caller(self, scope) -> str:
+        for name, value in scope.get('headers', []):
+            if name == b'x-api-key':
+                return 'key:' + value.decode('latin-1')
+        client = scope.get('client')
+        return f'address:{client[0]}' if client else 'address:unknown'
+
+    def _bucket(self, caller: str) -> TokenBucket:
+        bucket = self.buckets.get(caller)
+        if bucket is None:
+            if len(self.buckets) >= MAX_TRACKED_CALLERS:
+                self.buckets = {c: b for c, b in self.buckets.items() if not b.full}
+            bucket = self.buckets[caller] = TokenBucket(self.max_requests, self.max_requests / self.window)
+        return bucket
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        method, path = scope['method'], scope['path']
+        if not _matches(method, path, RATE_LIMITED_ROUTES):
+            return await self.app(scope, receive, send)
+
+        caller = self._caller(scope)
+        bucket = self._bucket(caller)
+        wait = bucket.take()
+        if wait:
+            logger.warning(f"Rate limit exceeded for {caller} on {method} {path}")
+            return await self._reject(scope, receive, send, 429, ERROR_MESSAGES['rate_limit'], wait)
+
+        rate_headers = [
+            (b'x-ratelimit-limit', str(self.max_requests).encode()),
+            (b'x-ratelimit-remaining', str(int(bucket.tokens)).encode())
+        ]
+
+        async def send_with_headers(message):
+            if message['type'] == 'http.response.start':
+                message = {**message, 'headers': list(message.get('headers', [])) + rate_headers}
+            await send(message)
+
+        if not _matches(method, path, HEAVY_ROUTES):
+            return await self.app(scope, receive, send_with_headers)
+
+        try:
+            async with self.gate.slot():
+                return await self.app(scope, receive, send_with_headers)
+        except AnalysisGateFull:
+            logger.warning(f"Analysis queue full, turning away {method} {path}")
+            # The request never ran, so give the caller its token back
+            bucket.tokens = min(bucket.capacity, bucket.tokens + 1)
+            return await self._reject(scope, receive, send, 503, ERROR_MESSAGES['overloaded'], self.gate.retry_after())
+
+    async def _reject(self, scope, receive, send, status: int, detail: str, retry_after: float):
+        response = JSONResponse(
+            status_code=status,
+            content={'detail': detail},
+            headers={'Retry-After': str(max(1, math.ceil(retry_after)))}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,97 @@
+import gzip
+import json
+import struct
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import Request
+from fastapi.responses import Response
+
+# Media type clients send in Accept (or select with ?format=columnar) to get the binary payload
+COLUMNAR_MEDIA_TYPE = 'application/vnd.timemachine.columnar'
+
+COLUMNAR_MAGIC = b'TMCB'
+COLUMNAR_VERSION = 1
+
+# Sections start on 8-byte boundaries so clients can view them as typed arrays without copying
+SECTION_ALIGNMENT = 8
+
+DTYPE_NAMES = {
+    np.dtype('<f4'): 'float32',
+    np.dtype('<f8'): 'float64',
+    np.dtype('<i4'): 'int32',
+    np.dtype('u1'): 'uint8'
+}
+
+
+def wants_columnar(http_request: Request, format: Optional[str] = None) -> bool:
+    """Returns True if the client asked for the columnar payload instead of JSON"""
+    if format:
+        return format == 'columnar'
+    return COLUMNAR_MEDIA_TYPE in http_request.headers.get('accept', '')
+
+
+def encode_columnar(columns: Dict[str, np.ndarray], strings: Dict[str, List[str]], meta: Dict[str, Any]) -> bytes:
+    """
+    Packs arrays and string tables into a single little-endian binary payload.
+
+    Layout:
+        'TMCB' | version (u16) | reserved (u16) | header length (u32) | header JSON | sections
+
+    The header JSON holds meta plus a 'sections' list of {name, dtype, shape,
+    offset, length}. Offsets are counted from the start of the data block, which
+    begins at the first 8-byte boundary after the header. A string
+    table named X is stored as two sections: 'X.offsets' (int32, one more entry
+    than strings) and 'X.data' (uint8, the UTF-8 text of all strings back to back).
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    for name, values in columns.items():
+        array = np.ascontiguousarray(values)
+        if array.dtype.newbyteorder('<') not in DTYPE_NAMES:
+            raise ValueError(f'Unsupported dtype {array.dtype} for column {name}')
+        arrays[name] = array.astype(array.dtype.newbyteorder('<'), copy=False)
+
+    for name, values in strings.items():
+        encoded = [value.encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype='<i4')
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        arrays[f'{name}.offsets'] = offsets
+        arrays[f'{name}.data'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+    def align(offset: int) -> int:
+        return -(-offset // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
+
+    sections = []
+    offset = 0
+    for name, array in arrays.items():
+        offset = align(offset)
+        sections.append({
+            'name': name,
+            'dtype': DTYPE_NAMES[array.dtype],
+            'shape': list(array.shape),
+            'offset': offset,
+            'length': array.nbytes
+        })
+        offset += array.nbytes
+
+    header = json.dumps({**meta, 'sections': sections}).encode('utf-8')
+    payload = bytearray(COLUMNAR_MAGIC)
+    payload += struct.pack('<HHI', COLUMNAR_VERSION, 0, len(header))
+    payload += header
+
+    data_start = align(len(payload))
+    for section, array in zip(sections, arrays.values()):
+        payload += b'\0' * (data_start + section['offset'] - len(payload))
+        payload += array.tobytes()
+    return bytes(payload)
+
+
+def columnar_response(http_request: Request, columns: Dict[str, np.ndarray],
+                      strings: Dict[str, List[str]], meta: Dict[str, Any]) -> Response:
+    """Encodes a columnar payload, gzip-compressed when the client accepts it"""
+    body = encode_columnar(columns, strings, meta)
+    headers = {'Vary': 'Accept, Accept-Encoding'}
+    if 'gzip' in http_request.headers.get('accept-encoding', ''):
+        body = gzip.compress(body, compresslevel=6)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(content=body, media_type=COLUMNAR_MEDIA_TYPE, headers=headers)
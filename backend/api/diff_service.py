@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import aiohttp
+
+from analyzer.diff_cache import DiffCache, get_diff_cache
+from analyzer.diff_parser import DiffIndex, DiffParser
+from analyzer.http_client import http_client
+from analyzer.scheduler import RequestScheduler, scheduler as shared_scheduler
+from api import DIFF_STREAM_CHUNK_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Only full SHAs name an immutable diff; branches and short SHAs are fetched every time
+FULL_SHA = re.compile(r'^[0-9a-f]{40}$')
+
+@dataclass
+class FileDiff:
+    """
+    One file's diff, readable in byte ranges without holding the whole commit
+    diff. read may block on the cache, so async code calls it in a worker thread.
+    """
+    size: int
+    read: Callable[[int, int], bytes]
+
+    def iter_chunks(self, offset: int = 0, length: Optional[int] = None,
+                    chunk_size: int = DIFF_STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+        end = self.size if length is None else min(self.size, offset + length)
+        while offset < end:
+            chunk = self.read(offset, min(chunk_size, end - offset))
+            if not chunk:
+                return
+            yield chunk
+            offset += len(chunk)
+
+
+class DiffService:
+    """
+    Serves single-file diffs of a commit from one fetch of the commit diff.
+
+    The first request for a commit downloads its diff once (concurrent requests
+    for the same commit share that download), indexes the byte range of every
+    file with DiffParser while it streams in, and stores both in the DiffCache;
+    later requests, for any file of the commit, read just that file's range
+    from the cache.
+    """
+
+    def __init__(self, cache: Optional[DiffCache] = None, scheduler: Optional[RequestScheduler] = None):
+        self.cache = cache or get_diff_cache()
+        self.scheduler = scheduler or shared_scheduler
+        self._fetches: Dict[Tuple[str, str, str], asyncio.Future] = {}
+
+    async def _fetch_diff(self, owner: str, repo: str, commit: str, github_token: str) -> Tuple[bytes, DiffIndex]:
+        """Downloads a commit diff, indexing it chunk by chunk as it arrives"""
+        headers = {
+            'Authorization': f'Bearer {github_token}',
+            'Accept': 'application/vnd.github.v3.diff'
+        }
+
+        async def read_body(response: aiohttp.ClientResponse) -> Tuple[bytes, DiffIndex]:
+            parser = DiffParser()
+            body = bytearray()
+            async for chunk in response.content.iter_chunked(DIFF_STREAM_CHUNK_BYTES):
+                parser.feed(chunk)
+                body += chunk
+            return bytes(body), parser.close()
+
+        return await self.scheduler.request(
+            http_client.session(), 'GET', f'https://api.github.com/repos/{owner}/{repo}/commits/{commit}', read_body,
+            headers=headers
+        )
+
+    async def _load(self, owner: str, repo: str, sha: str, github_token: str) -> Dict[str, Tuple[int, int]]:
+        diff, parsed = await self._fetch_diff(owner, repo, sha, github_token)
+        index = parsed.spans()
+        await asyncio.to_thread(self.cache.put, owner, repo, sha, diff, index)
+        logger.info(f"Cached diff of {owner}/{repo}@{sha[:7]}: {len(index)} files, {len(diff)} bytes")
+        return index
+
+    async def get_file_diff(self, owner: str, repo: str, commit: str, path: str,
+                            github_token: str) -> Optional[FileDiff]:
+        """
+        Returns the diff of one file in a commit, or None if the commit does not touch it.
+
+        Raises:
+            RequestFailed: If the commit diff cannot be fetched
+        """
+        commit = commit.lower()
+        if not FULL_SHA.match(commit):
+            diff, parsed = await self._fetch_diff(owner, repo, commit, github_token)
+            entry = parsed.get(path)
+            if entry is None:
+                return None
+            start, end = entry.start, entry.end
+            return FileDiff(end - start, lambda offset, length: diff[start + offset:start + offset + length])
+
+        index = await asyncio.to_thread(self.cache.get_index, owner, repo, commit)
+        if index is None:
+            key = (owner.lower(), repo.lower(), commit)
+            fetch = self._fetches.get(key)
+            if fetch is None:
+                fetch = self._fetches[key] = asyncio.ensure_future(self._load(owner, repo, commit, github_token))
+                fetch.add_done_callback(lambda _: self._fetches.pop(key, None))
+            index = await asyncio.shield(fetch)
+
+        span = index.get(path)
+        if span is None:
+            return None
+        start, end = span
+        return FileDiff(end - start, lambda offset, length: self.cache.read(owner, repo, commit, start + offset, length))
+
+
+_shared_service: Optional[DiffService] = None
+
+
+def get_diff_service() -> DiffService:
+    """Returns the process-wide diff service, creating it on first use"""
+    global _shared_service
+    if _shared_service is None:
+        _shared_service = DiffService()
+    return _shared_service
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from api import JOB_QUEUE_SIZE, JOB_RETENTION_TIME, JOB_WORKERS
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ('queued', 'running', 'succeeded', 'failed')
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class JobFailed(Exception):
+    """Raised by a job runner to fail a job with an HTTP-style status code"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Job:
+    id: str
+    key: Tuple
+    params: Dict[str, Any]
+    status: str = 'queued'
+    progress: Dict[str, Any] = field(default_factory=dict)
+    result: Any = None
+    error: Optional[str] = None
+    error_status: Optional[int] = None
+    submitters: int = 1
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('succeeded', 'failed')
+
+    def to_status(self) -> Dict[str, Any]:
+        """Public view of the job, without its result"""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'params': self.params,
+            'progress': self.progress,
+            'error': self.error,
+            'submitters': self.submitters,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobManager:
+    """
+    Runs analysis jobs on a fixed pool of worker tasks fed by a bounded queue.
+
+    Submissions are single-flight: while a job for a key is queued or running,
+    submitting the same key returns that job instead of starting another one.
+    Finished jobs are kept for JOB_RETENTION_TIME seconds so their results can
+    be collected, then dropped.
+    """
+
+    def __init__(self, runner: Callable[[Job], Awaitable[Any]], workers: int = JOB_WORKERS,
+                 max_queued: int = JOB_QUEUE_SIZE, retention: float = JOB_RETENTION_TIME):
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self.jobs: Dict[str, Job] = {}
+        self.active: Dict[Tuple, Job] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self.tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Starts the worker tasks; called once the event loop is running"""
+        if self.tasks:
+            return
+        self.queue = asyncio.Queue(maxsize=self.max_queued)
+        self.tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Started {self.workers} analysis job workers")
+
+    async def stop(self):
+        """Cancels the workers; jobs still queued or running are marked failed"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        for job in list(self.active.values()):
+            self._finish(job, error='Server shutting down', error_status=503)
+
+    def submit(self, key: Tuple, params: Dict[str, Any]) -> Tuple[Job, bool]:
+        """
+        Queues a job for key, or joins the job already queued or running for it.
+
+        Returns:
+            Tuple: (job, True if a new job was created)
+
+        Raises:
+            JobQueueFull: If a new job is needed and the queue is full
+        """
+        self._prune()
+        job = self.active.get(key)
+        if job is not None:
+            job.submitters += 1
+            return job, False
+
+        if self.queue is None:
+            raise RuntimeError('JobManager has not been started')
+        job = Job(id=uuid.uuid4().hex, key=key, params=params)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f'{self.max_queued} jobs already queued')
+        self.jobs[job.id] = job
+        self.active[key] = job
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self.jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {state: 0 for state in JOB_STATES}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return {'workers': len(self.tasks), 'queued': self.queue.qsize() if self.queue else 0, 'jobs': counts}
+
+    async def _worker(self, number: int):
+        while True:
+            job = await self.queue.get()
+            job.status = 'running'
+            job.started_at = time.time()
+            logger.info(f"Worker {number} running job {job.id} for {job.key}")
+            try:
+                self._finish(job, result=await self.runner(job))
+            except asyncio.CancelledError:
+                self._finish(job, error='Job cancelled', error_status=503)
+                raise
+            except JobFailed as e:
+                self._finish(job, error=str(e), error_status=e.status)
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {str(e)}")
+                self._finish(job, error=str(e), error_status=500)
+            finally:
+                self.queue.task_done()
+
+    def _finish(self, job: Job, result: Any = None, error: Optional[str] = None,
+                error_status: Optional[int] = None):
+        job.status = 'failed' if error else 'succeeded'
+        job.result, job.error, job.error_status = result, error, error_status
+        job.finished_at = time.time()
+        if self.active.get(job.key) is job:
+            del self.active[job.key]
+
+    def _prune(self):
+        """Drops finished jobs older than the retention time"""
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self.jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self.jobs[job_id]
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from api import CACHE_EXPIRE_TIME, RESULT_CACHE_DISK_BYTES, RESULT_CACHE_MEMORY_BYTES, RESULT_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# How often the in-process tier picks up invalidations made by other workers
+INVALIDATION_POLL_SECONDS = 1.0
+
+
+def result_key(kind: str, owner: str, repo: str, limit: int, head_sha: str, **options: Any) -> str:
+    """Builds a cache key for a result derived from the history ending at head_sha"""
+    query = '&'.join(f'{name}={options[name]}' for name in sorted(options))
+    return f'{kind}:{owner.lower()}/{repo.lower()}@{head_sha}?limit={limit}&{query}'
+
+
+class ResultCache:
+    """
+    Two-tier cache of analysis results.
+
+    The first tier is an in-process LRU of serialized results bounded by
+    memory_bytes. Misses fall through to a SQLite file bounded by disk_bytes,
+    which survives restarts and is shared by all uvicorn workers; disk hits are
+    promoted to the first tier. Entries expire ttl seconds after they were
+    stored, in both tiers.
+
+    Results are keyed by the head SHA of the history they were built from (see
+    result_key), so a push naturally misses. invalidate() drops everything
+    cached for a repository; other workers see it through an invalidation log
+    that they poll at most once per INVALIDATION_POLL_SECONDS.
+
+    Counters are per process.
+    """
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, memory_bytes: int = RESULT_CACHE_MEMORY_BYTES,
+                 disk_bytes: int = RESULT_CACHE_DISK_BYTES, ttl: float = CACHE_EXPIRE_TIME):
+        self.path = path
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (owner/repo, serialized result, stored at)
+        self._memory: 'OrderedDict[str, Tuple[str, bytes, float]]' = OrderedDict()
+        self._memory_size = 0
+        self.counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'expirations': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+            'invalidations': 0
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                repository TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_repository ON results (repository)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS invalidations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                repository TEXT NOT NULL,
+                at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self._last_invalidation = self._conn.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM invalidations"
+        ).fetchone()[0]
+        self._last_poll = time.time()
+
+    @staticmethod
+    def _repository(owner: str, repo: str) -> str:
+        return f'{owner.lower()}/{repo.lower()}'
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Returns the cached result for key, or None on a miss or once it has expired"""
+        now = time.time()
+        with self._lock:
+            self._poll_invalidations(now)
+
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[2] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return json.loads(entry[1])
+                self._drop_from_memory(key)
+                self.counters['expirations'] += 1
+
+            row = self._conn.execute(
+                "SELECT repository, payload, stored FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self.counters['expirations'] += 1
+                self.counters['misses'] += 1
+                return None
+
+            self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            serialized = zlib.decompress(row[1])
+            self._store_in_memory(key, row[0], serialized, row[2])
+            self.counters['disk_hits'] += 1
+        return json.loads(serialized)
+
+    def put(self, key: str, owner: str, repo: str, result: Dict):
+        """Stores a result in both tiers, evicting least recently used entries as needed"""
+        serialized = json.dumps(result).encode('utf-8')
+        payload = zlib.compress(serialized)
+        repository = self._repository(owner, repo)
+        now = time.time()
+        with self._lock:
+            self._store_in_memory(key, repository, serialized, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, repository, payload, size, stored, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, repository, payload, len(payload), now, now)
+            )
+            self._conn.commit()
+            self._evict_from_disk(now)
+
+    def invalidate(self, owner: str, repo: str) -> int:
+        """Drops every result cached for a repository, in this and other workers; returns the disk entries removed"""
+        repository = self._repository(owner, repo)
+        with self._lock:
+            for key in [k for k, entry in self._memory.items() if entry[0] == repository]:
+                self._drop_from_memory(key)
+            removed = self._conn.execute("DELETE FROM results WHERE repository = ?", (repository,)).rowcount
+            now = time.time()
+            self._conn.execute("INSERT INTO invalidations (repository, at) VALUES (?, ?)", (repository, now))
+            # Entries stored before an old invalidation have expired anyway, so the log only needs one TTL
+            self._conn.execute("DELETE FROM invalidations WHERE at < ?", (now - self.ttl - INVALIDATION_POLL_SECONDS,))
+            self._conn.commit()
+            self.counters['invalidations'] += 1
+        logger.info(f"Invalidated cached results for {repository}")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            disk_entries, disk_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+            lookups = self.counters['memory_hits'] + self.counters['disk_hits'] + self.counters['misses']
+            hits = self.counters['memory_hits'] + self.counters['disk_hits']
+            return {
+                **self.counters,
+                'hit_rate': hits / lookups if lookups else 0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'memory_max_bytes': self.memory_bytes,
+                'disk_entries': disk_entries,
+                'disk_bytes': disk_size,
+                'disk_max_bytes': self.disk_bytes,
+                'ttl': self.ttl
+            }
+
+    def _store_in_memory(self, key: str, repository: str, serialized: bytes, stored: float):
+        if key in self._memory:
+            self._drop_from_memory(key)
+        if len(serialized) > self.memory_bytes:
+            return
+        self._memory[key] = (repository, serialized, stored)
+        self._memory_size += len(serialized)
+        while self._memory_size > self.memory_bytes:
+            oldest = next(iter(self._memory))
+            self._drop_from_memory(oldest)
+            self.counters['memory_evictions'] += 1
+
+    def _drop_from_memory(self, key: str):
+        _, serialized, _ = self._memory.pop(key)
+        self._memory_size -= len(serialized)
+
+    def _evict_from_disk(self, now: float):
+        """Deletes expired entries, then least recently used ones until under 90% of disk_bytes"""
+        expired = self._conn.execute("DELETE FROM results WHERE stored < ?", (now - self.ttl,)).rowcount
+        size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        evicted = []
+        if size > self.disk_bytes:
+            target = self.disk_bytes * 0.9
+            for key, entry_size in self._conn.execute("SELECT key, size FROM results ORDER BY accessed").fetchall():
+                if size <= target:
+                    break
+                evicted.append((key,))
+                size -= entry_size
+            self._conn.executemany("DELETE FROM results WHERE key = ?", evicted)
+        self._conn.commit()
+        self.counters['expirations'] += expired
+        self.counters['disk_evictions'] += len(evicted)
+
+    def _poll_invalidations(self, now: float):
+        """Applies invalidations logged by other workers since the last poll"""
+        if now - self._last_poll < INVALIDATION_POLL_SECONDS:
+            return
+        self._last_poll = now
+        rows = self._conn.execute(
+            "SELECT id, repository FROM invalidations WHERE id > ?", (self._last_invalidation,)
+        ).fetchall()
+        for invalidation_id, repository in rows:
+            for key in [k for k, entry in self._memory.items() if entry[0] == repository]:
+                self._drop_from_memory(key)
+            self._last_invalidation = invalidation_id
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Returns the process-wide result cache, opening it on first use"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ResultCache()
+    return _shared_cache
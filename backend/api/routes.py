@@ -1,14 +1,27 @@
-from fastapi import APIRouter, HTTPException, Security, Depends
-from typing import Dict, Optional
+from fastapi import APIRouter, HTTPException, Security, Depends, Request
+from typing import Callable, Dict, List, Optional
+from datetime import datetime
+import asyncio
+import json
 import os
 from pydantic import BaseModel
-from analyzer.repo_analyzer import RepositoryAnalyzer
+from analyzer.repo_analyzer import COMMIT_SOURCES, RepositoryAnalyzer, graph_from_json, graph_to_json
+from analyzer.analysis_cache import get_analysis_cache
 from analyzer.graph_processor import GraphProcessor
+from analyzer.http_client import http_client
+from analyzer.layering import LAYOUT_STRATEGIES
+from analyzer.scheduler import RequestFailed
+from api import DIFF_INLINE_MAX_BYTES
+from api.admission import analysis_gate
+from api.columnar import columnar_response, wants_columnar
+from api.diff_service import get_diff_service
+from api.jobs import Job, JobFailed, JobManager, JobQueueFull
+from api.result_cache import get_result_cache, result_key
 from dotenv import load_dotenv, set_key
 import traceback
 import logging
 from fastapi.security import APIKeyHeader
-import aiohttp
+from fastapi.responses import Response, StreamingResponse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -39,12 +52,26 @@ class RepositoryRequest(BaseModel):
     owner: str
     repo: str
     limit: Optional[int] = 50
+    source: Optional[str] = 'rest'
+    analyze_changes: Optional[bool] = True
+    layout: Optional[str] = 'longest_path'
+    max_layer_width: Optional[int] = None
+
+class LevelRangeRequest(RepositoryRequest):
+    min_level: int = 0
+    max_level: Optional[int] = None
+
+class DateWindowRequest(RepositoryRequest):
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
 
 class DiffRequest(BaseModel):
     owner: str
     repo: str
     commit: str
     file: str
+    offset: int = 0
+    length: Optional[int] = None
 
 class OpenAIKeyResponse(BaseModel):
     key: str
@@ -85,80 +112,467 @@ async def update_api_key(key_data: ApiKeyUpdate, api_key: str = Depends(verify_a
         logger.error(f"Error updating API key: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def validate_analysis_request(request: RepositoryRequest):
+    """Checks server configuration and request options before any analysis starts"""
+    if request.source not in COMMIT_SOURCES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown source '{request.source}', expected one of: {', '.join(COMMIT_SOURCES)}"
+        )
+
+    # Local mirrors are read without GitHub, and only change analysis calls the LLM
+    missing = []
+    if request.source != 'local' and not os.getenv("GITHUB_TOKEN"):
+        missing.append("GITHUB_TOKEN")
+    if request.analyze_changes and not os.getenv("OPENAI_API_KEY"):
+        missing.append("OPENAI_API_KEY")
+    if missing:
+        logger.error(f"Missing API keys in server configuration: {', '.join(missing)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Missing API keys in server configuration"
+        )
+    if request.layout not in LAYOUT_STRATEGIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown layout '{request.layout}', expected one of: {', '.join(LAYOUT_STRATEGIES)}"
+        )
+
+def new_analyzer() -> RepositoryAnalyzer:
+    return RepositoryAnalyzer(
+        github_token=os.getenv("GITHUB_TOKEN"),
+        openai_key=os.getenv("OPENAI_API_KEY")
+    )
+
+async def resolve_head_sha(request: RepositoryRequest) -> Optional[str]:
+    """Returns the head SHA the analysis would start from, or None (skipping the result cache) if it cannot be read"""
+    try:
+        return await new_analyzer().fetch_head_sha(request.owner, request.repo, source=request.source)
+    except Exception as e:
+        logger.warning(f"Could not resolve head of {request.owner}/{request.repo}, bypassing result cache: {str(e)}")
+        return None
+
+def analysis_cache_key(kind: str, request: RepositoryRequest, head_sha: str, **options) -> str:
+    return result_key(kind, request.owner, request.repo, request.limit, head_sha,
+                      source=request.source, analyze=int(request.analyze_changes), **options)
+
+async def run_analysis(request: RepositoryRequest, progress: Optional[Callable[[Dict], None]] = None,
+                       head_sha: Optional[str] = None, on_listed: Optional[Callable] = None,
+                       on_commit: Optional[Callable[[str, Dict], None]] = None):
+    """
+    Validates an analysis request and returns the analyzed commit graph, from
+    the result cache when the repository head has already been analyzed.
+    on_listed and on_commit are passed on to the analyzer, and are not called
+    for cached graphs.
+    """
+    validate_analysis_request(request)
+
+    result_cache = get_result_cache()
+    head_sha = head_sha or await resolve_head_sha(request)
+    cache_key = analysis_cache_key('graph', request, head_sha) if head_sha else None
+    if cache_key:
+        cached = await asyncio.to_thread(result_cache.get, cache_key)
+        if cached is not None:
+            logger.info(f"Using cached analysis of {request.owner}/{request.repo} at {head_sha[:7]}")
+            graph = graph_from_json(cached)
+            graph.graph['head_sha'] = head_sha
+            if progress:
+                progress({'stage': 'done', 'commits_discovered': graph.number_of_nodes(),
+                          'commits_analyzed': graph.number_of_nodes(), 'commits_failed': 0})
+            return graph
+
+    analyzer = new_analyzer()
+
+    logger.info(f"Analyzing repository: {request.owner}/{request.repo}")
+    try:
+        graph = await analyzer.analyze_repository(
+            request.owner,
+            request.repo,
+            request.limit,
+            source=request.source,
+            analyze_changes=request.analyze_changes,
+            progress=progress,
+            on_listed=on_listed,
+            on_commit=on_commit
+        )
+    except Exception as e:
+        logger.error(f"Error during analysis: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Analysis failed: {str(e)}"
+        )
+
+    if not graph or graph.number_of_nodes() == 0:
+        logger.error("No nodes found in analyzed repository")
+        raise HTTPException(
+            status_code=404,
+            detail="No commits found in repository"
+        )
+
+    logger.info(f"Graph created with {graph.number_of_nodes()} nodes")
+    graph.graph['head_sha'] = head_sha
+    # Partial results are not cached, so failed commits are retried next time
+    if cache_key and not graph.graph.get('failed_commits'):
+        await asyncio.to_thread(result_cache.put, cache_key, request.owner, request.repo, graph_to_json(graph))
+    return graph
+
+def graph_processor_for(graph, request: RepositoryRequest) -> GraphProcessor:
+    return GraphProcessor(
+        graph,
+        layout_strategy=request.layout,
+        max_layer_width=request.max_layer_width
+    )
+
+def render_visualization(graph, processor: GraphProcessor, http_request: Request, format: Optional[str] = None):
+    """Lays out an analyzed graph and returns it as JSON or, when negotiated, the columnar payload"""
+    openai_key = os.getenv("OPENAI_API_KEY")
+
+    if wants_columnar(http_request, format):
+        payload = processor.process_columnar()
+        logger.info(f"Encoding {len(payload['strings']['ids'])} nodes as columnar payload")
+        return columnar_response(http_request, payload['columns'], payload['strings'], {
+            'metrics': payload['metrics'],
+            'config': {'openai_key': openai_key},
+            'failed_commits': graph.graph.get('failed_commits', {})
+        })
+
+    visualization_data = processor.process_for_visualization()
+
+    visualization_data['config'] = {
+        'openai_key': openai_key
+    }
+    visualization_data['failed_commits'] = graph.graph.get('failed_commits', {})
+
+    if not visualization_data.get('nodes') or not visualization_data.get('edges'):
+        logger.error("Invalid visualization data structure")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to process repository data"
+        )
+
+    logger.info(f"Processed {len(visualization_data['nodes'])} nodes and {len(visualization_data['edges'])} edges")
+    return visualization_data
+
+async def run_analysis_job(job: Job):
+    """Job runner: analyzes the repository, reporting progress on the job"""
+    try:
+        # Jobs count against the same cap as synchronous analyses, but wait in their own queue
+        async with analysis_gate.slot(bounded=False):
+            return await run_analysis(RepositoryRequest(**job.params), progress=job.progress.update)
+    except HTTPException as he:
+        raise JobFailed(he.status_code, he.detail)
+
+# Started and stopped with the application (see main.py)
+job_manager = JobManager(run_analysis_job)
+
 @router.post("/api/v1/analyze")
-async def analyze_repository(request: RepositoryRequest, api_key: str = Depends(verify_api_key)):
-    """Analyzes a GitHub repository and returns visualization data"""
+async def analyze_repository(request: RepositoryRequest, http_request: Request, format: Optional[str] = None,
+                             api_key: str = Depends(verify_api_key)):
+    """
+    Analyzes a GitHub repository and returns visualization data.
+
+    JSON by default; the compact columnar payload is returned instead when the
+    client sends Accept: application/vnd.timemachine.columnar or ?format=columnar.
+    """
     try:
-        github_token = os.getenv("GITHUB_TOKEN")
-        openai_key = os.getenv("OPENAI_API_KEY")
+        validate_analysis_request(request)
+        result_cache = get_result_cache()
+        head_sha = await resolve_head_sha(request)
 
-        if not github_token or not openai_key:
-            logger.error("Missing API keys in server configuration")
-            raise HTTPException(
-                status_code=500,
-                detail="Missing API keys in server configuration"
-            )
+        # Laid-out JSON is cached too; the columnar payload is cheap to build from the cached graph
+        cache_key = None
+        if head_sha and not wants_columnar(http_request, format):
+            cache_key = analysis_cache_key('visualization', request, head_sha,
+                                           layout=request.layout, width=request.max_layer_width)
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            if cached is not None:
+                # Annotate a copy; what the cache hands out is not ours to change
+                return {**cached, 'config': {'openai_key': os.getenv("OPENAI_API_KEY")}}
+
+        graph = await run_analysis(request, head_sha=head_sha)
+        visualization_data = render_visualization(graph, graph_processor_for(graph, request), http_request, format)
+        if cache_key and not visualization_data['failed_commits']:
+            # The key is configuration, not a result
+            await asyncio.to_thread(result_cache.put, cache_key, request.owner, request.repo,
+                                    {k: v for k, v in visualization_data.items() if k != 'config'})
+        return visualization_data
 
-        analyzer = RepositoryAnalyzer(
-            github_token=github_token,
-            openai_key=openai_key
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Server error: {str(e)}"
         )
 
-        logger.info(f"Analyzing repository: {request.owner}/{request.repo}")
-        try:
-            graph = await analyzer.analyze_repository(
-                request.owner,
-                request.repo,
-                request.limit
-            )
-            
-            if not graph or graph.number_of_nodes() == 0:
-                logger.error("No nodes found in analyzed repository")
-                raise HTTPException(
-                    status_code=404,
-                    detail="No commits found in repository"
-                )
-            
-            logger.info(f"Graph created with {graph.number_of_nodes()} nodes")
-            
-            processor = GraphProcessor(graph)
-            visualization_data = processor.process_for_visualization()
-            
-            visualization_data['config'] = {
-                'openai_key': openai_key
-            }
-            
-            if not visualization_data.get('nodes') or not visualization_data.get('edges'):
-                logger.error("Invalid visualization data structure")
-                raise HTTPException(
-                    status_code=500,
-                    detail="Failed to process repository data"
-                )
-            
-            logger.info(f"Processed {len(visualization_data['nodes'])} nodes and {len(visualization_data['edges'])} edges")
-            return visualization_data
-            
-        except Exception as e:
-            logger.error(f"Error during analysis: {str(e)}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+def commit_delta(sha: str, attributes: Dict) -> Dict:
+    """Stream record with the node data of a commit that is only known once it has been analyzed"""
+    return {
+        'type': 'commit',
+        'id': sha,
+        'data': {
+            'files_count': attributes.get('files_count', 0),
+            'files_changed': attributes.get('files_changed', []),
+            'additions': attributes.get('additions', 0),
+            'deletions': attributes.get('deletions', 0),
+            'languages': attributes.get('languages', {}),
+            'analysis': attributes.get('analysis', ''),
+            'error': attributes.get('error')
+        }
+    }
+
+@router.post("/api/v1/analyze/stream")
+async def analyze_repository_stream(request: RepositoryRequest, api_key: str = Depends(verify_api_key)):
+    """
+    Analyzes a GitHub repository and streams the result as NDJSON, one record per line:
+
+    - 'topology': the laid-out nodes, edges and metrics, sent as soon as the
+      commit list is complete; 'pending' lists the commits whose files and
+      analysis are still to come
+    - 'commit': the node data to merge into one pending commit, sent as soon
+      as that commit has been analyzed
+    - 'done' with the failed commits, or 'error' with a status and detail
+    """
+    try:
+        validate_analysis_request(request)
+        head_sha = await resolve_head_sha(request)
+
+        cached = None
+        if head_sha:
+            cache_key = analysis_cache_key('visualization', request, head_sha,
+                                           layout=request.layout, width=request.max_layer_width)
+            cached = await asyncio.to_thread(get_result_cache().get, cache_key)
+
+        records: asyncio.Queue = asyncio.Queue()
+        analyzed = set()
+        topology_sent = False
+
+        def send_topology(graph, pending: List[str]):
+            nonlocal topology_sent
+            visualization = graph_processor_for(graph, request).process_for_visualization()
+            records.put_nowait({'type': 'topology', **visualization, 'pending': pending})
+            topology_sent = True
+
+        def on_listed(graph):
+            send_topology(graph, [sha for sha in graph.nodes if sha not in analyzed])
+
+        def on_commit(sha: str, attributes: Dict):
+            analyzed.add(sha)
+            # Commits analyzed before the topology went out are already complete in it
+            if topology_sent:
+                records.put_nowait(commit_delta(sha, attributes))
+
+        async def analyze():
+            try:
+                if cached is not None:
+                    records.put_nowait({'type': 'topology', **cached, 'pending': []})
+                    failed_commits = cached['failed_commits']
+                else:
+                    graph = await run_analysis(request, head_sha=head_sha, on_listed=on_listed, on_commit=on_commit)
+                    if not topology_sent:
+                        # Served from the graph cache: nothing is pending
+                        send_topology(graph, [])
+                    failed_commits = graph.graph.get('failed_commits', {})
+                records.put_nowait({'type': 'done', 'head_sha': head_sha, 'failed_commits': failed_commits})
+            except HTTPException as he:
+                records.put_nowait({'type': 'error', 'status': he.status_code, 'detail': he.detail})
+            except Exception as e:
+                logger.error(f"Error streaming analysis: {str(e)}")
+                logger.error(f"Traceback: {traceback.format_exc()}")
+                records.put_nowait({'type': 'error', 'status': 500, 'detail': f"Server error: {str(e)}"})
+            finally:
+                records.put_nowait(None)
+
+        async def stream():
+            task = asyncio.ensure_future(analyze())
+            try:
+                while True:
+                    record = await records.get()
+                    if record is None:
+                        break
+                    yield json.dumps(record) + '\n'
+            finally:
+                # Stop analyzing once the client has gone away
+                task.cancel()
+
+        return StreamingResponse(stream(), media_type='application/x-ndjson')
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Server error: {str(e)}"
+        )
+
+@router.post("/api/v1/analyze/overview")
+async def analyze_overview(request: RepositoryRequest, api_key: str = Depends(verify_api_key)):
+    """Returns a coarse view of the history with linear chains of commits collapsed into super-nodes"""
+    try:
+        graph = await run_analysis(request)
+        overview = graph_processor_for(graph, request).process_overview()
+        overview['failed_commits'] = graph.graph.get('failed_commits', {})
+        return overview
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error building overview: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Server error: {str(e)}"
+        )
+
+@router.post("/api/v1/analyze/levels")
+async def analyze_level_range(request: LevelRangeRequest, api_key: str = Depends(verify_api_key)):
+    """Returns the commits laid out on levels min_level..max_level and the edges between them"""
+    try:
+        if request.max_level is not None and request.max_level < request.min_level:
             raise HTTPException(
-                status_code=500,
-                detail=f"Analysis failed: {str(e)}"
+                status_code=400,
+                detail="max_level must not be less than min_level"
             )
-            
+        graph = await run_analysis(request)
+        return graph_processor_for(graph, request).process_level_range(request.min_level, request.max_level)
+
     except HTTPException as he:
         raise he
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error(f"Error slicing levels: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Server error: {str(e)}"
+        )
+
+@router.post("/api/v1/analyze/window")
+async def analyze_date_window(request: DateWindowRequest, api_key: str = Depends(verify_api_key)):
+    """Returns the commits dated between since and until and the edges between them"""
+    try:
+        graph = await run_analysis(request)
+        return graph_processor_for(graph, request).process_date_window(request.since, request.until)
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error slicing date window: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(
             status_code=500,
             detail=f"Server error: {str(e)}"
         )
 
+@router.post("/api/v1/jobs", status_code=202)
+async def submit_analysis_job(request: RepositoryRequest, api_key: str = Depends(verify_api_key)):
+    """
+    Queues an analysis and returns its job id straight away. A submission for the
+    same repository, limit and ingest options as a job still queued or running
+    joins that job instead of starting another analysis.
+    """
+    validate_analysis_request(request)
+    key = (request.owner.lower(), request.repo.lower(), request.limit, request.source, request.analyze_changes)
+    try:
+        job, created = job_manager.submit(key, request.model_dump())
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Analysis queue is full: {str(e)}"
+        )
+    logger.info(f"{'Queued' if created else 'Joined'} job {job.id} for {request.owner}/{request.repo}")
+    return {**job.to_status(), 'coalesced': not created}
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown job '{job_id}'"
+        )
+    return job
+
+@router.get("/api/v1/jobs/{job_id}")
+async def get_analysis_job(job_id: str, api_key: str = Depends(verify_api_key)):
+    """Returns a job's status and progress counters"""
+    return get_job_or_404(job_id).to_status()
+
+@router.get("/api/v1/jobs/{job_id}/result")
+async def get_analysis_job_result(job_id: str, http_request: Request, layout: Optional[str] = None,
+                                  max_layer_width: Optional[int] = None, format: Optional[str] = None,
+                                  api_key: str = Depends(verify_api_key)):
+    """
+    Returns the visualization data of a finished job, laid out with the options
+    it was submitted with unless layout/max_layer_width are given.
+    """
+    job = get_job_or_404(job_id)
+    if not job.finished:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is still {job.status}"
+        )
+    if job.status == 'failed':
+        raise HTTPException(
+            status_code=job.error_status or 500,
+            detail=job.error
+        )
+
+    request = RepositoryRequest(**{
+        **job.params,
+        'layout': layout or job.params['layout'],
+        'max_layer_width': max_layer_width if max_layer_width is not None else job.params['max_layer_width']
+    })
+    if request.layout not in LAYOUT_STRATEGIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown layout '{request.layout}', expected one of: {', '.join(LAYOUT_STRATEGIES)}"
+        )
+    try:
+        return render_visualization(job.result, graph_processor_for(job.result, request), http_request, format)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error rendering job result: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Server error: {str(e)}"
+        )
+
+@router.get("/api/v1/cache/stats")
+async def get_cache_stats(api_key: str = Depends(verify_api_key)):
+    """Returns hit/miss/eviction counters and sizes of the analysis result cache"""
+    return get_result_cache().stats()
+
+@router.get("/api/v1/cache/analyses/stats")
+async def get_analysis_cache_stats(api_key: str = Depends(verify_api_key)):
+    """Returns hit/miss/eviction counters and size of the LLM change summary cache"""
+    return get_analysis_cache().stats()
+
+@router.get("/api/v1/http/stats")
+async def get_http_stats(api_key: str = Depends(verify_api_key)):
+    """Returns request counters and connection pool usage of the shared HTTP client"""
+    return http_client.stats()
+
+@router.delete("/api/v1/cache/{owner}/{repo}")
+async def invalidate_cache(owner: str, repo: str, api_key: str = Depends(verify_api_key)):
+    """Drops every cached analysis of a repository"""
+    removed = await asyncio.to_thread(get_result_cache().invalidate, owner, repo)
+    return {"status": "success", "removed": removed}
+
 @router.post("/api/v1/diff")
 async def get_file_diff(request: DiffRequest, api_key: str = Depends(verify_api_key)):
-    """Retrieves the diff content for a specific file in a commit"""
+    """
+    Retrieves the diff content for a specific file in a commit.
+
+    Returned inline as JSON when small. Diffs over DIFF_INLINE_MAX_BYTES are
+    streamed as text/x-diff, and a byte range of the file's diff can be asked
+    for with offset/length, answered as 206 Partial Content.
+    """
     try:
         github_token = os.getenv("GITHUB_TOKEN")
         if not github_token:
@@ -167,40 +581,40 @@ async def get_file_diff(request: DiffRequest, api_key: str = Depends(verify_api_
                 detail="GitHub token not configured on server"
             )
 
-        headers = {
-            'Authorization': f'Bearer {github_token}',
-            'Accept': 'application/vnd.github.v3.diff'
-        }
+        try:
+            file_diff = await get_diff_service().get_file_diff(
+                request.owner, request.repo, request.commit, request.file, github_token
+            )
+        except RequestFailed as e:
+            logger.error(f"Failed to fetch diff: {str(e)}")
+            raise HTTPException(
+                status_code=e.status or 502,
+                detail="Failed to fetch diff"
+            )
+
+        if file_diff is None:
+            logger.info(f"No changes found for file: {request.file}")
+            return {"content": "No changes found for this file"}
 
-        async with aiohttp.ClientSession() as session:
-            commit_url = f'https://api.github.com/repos/{request.owner}/{request.repo}/commits/{request.commit}'
-            async with session.get(commit_url, headers=headers) as response:
-                if response.status != 200:
-                    logger.error(f"Failed to fetch commit: {await response.text()}")
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail="Failed to fetch commit details"
-                    )
-                commit_data = await response.json()
-
-            diff_url = f'https://api.github.com/repos/{request.owner}/{request.repo}/commits/{request.commit}'
-            async with session.get(diff_url, headers=headers) as response:
-                if response.status != 200:
-                    logger.error(f"Failed to fetch diff: {await response.text()}")
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail="Failed to fetch diff"
-                    )
-                
-                full_diff = await response.text()
-                file_diffs = parse_diff(full_diff)
-                requested_diff = file_diffs.get(request.file)
-                
-                if not requested_diff:
-                    logger.info(f"No changes found for file: {request.file}")
-                    return {"content": "No changes found for this file"}
-                
-                return {"content": requested_diff}
+        headers = {'X-Diff-Size': str(file_diff.size)}
+        if request.offset or request.length is not None:
+            if request.offset >= max(file_diff.size, 1) or (request.length is not None and request.length <= 0):
+                raise HTTPException(
+                    status_code=416,
+                    detail=f"Range not satisfiable for a diff of {file_diff.size} bytes"
+                )
+            length = file_diff.size - request.offset if request.length is None else request.length
+            content = await asyncio.to_thread(file_diff.read, request.offset, length)
+            headers['Content-Range'] = f'bytes {request.offset}-{request.offset + len(content) - 1}/{file_diff.size}'
+            return Response(content=content, status_code=206, media_type='text/x-diff', headers=headers)
+
+        if file_diff.size > DIFF_INLINE_MAX_BYTES:
+            logger.info(f"Streaming {file_diff.size} byte diff of {request.file}")
+            # Starlette iterates a plain iterator in its thread pool, off the event loop
+            return StreamingResponse(file_diff.iter_chunks(), media_type='text/x-diff', headers=headers)
+
+        content = await asyncio.to_thread(file_diff.read, 0, file_diff.size)
+        return {"content": content.decode('utf-8', errors='replace')}
 
     except HTTPException as he:
         raise he
@@ -211,26 +625,3 @@ async def get_file_diff(request: DiffRequest, api_key: str = Depends(verify_api_
             status_code=500,
             detail=f"Failed to get diff: {str(e)}"
         )
-
-def parse_diff(diff_content: str) -> Dict[str, str]:
-    """Parse a git diff and return a dictionary of filename -> diff content"""
-    files = {}
-    current_file = None
-    current_content = []
-    
-    for line in diff_content.split('\n'):
-        if line.startswith('diff --git'):
-            if current_file and current_content:
-                files[current_file] = '\n'.join(current_content)
-            current_content = [line]
-            try:
-                current_file = line.split(' b/')[-1]
-            except:
-                current_file = None
-        elif current_file:
-            current_content.append(line)
-    
-    if current_file and current_content:
-        files[current_file] = '\n'.join(current_content)
-    
-    return files
\ No newline at end of file
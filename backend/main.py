@@ -1,6 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import router
+from analyzer.http_client import http_client
+from analyzer.patch_features import shutdown_pool
+from api.admission import AdmissionMiddleware
+from api.routes import job_manager, router
 from dotenv import load_dotenv
 import os
 
@@ -19,6 +22,9 @@ async def root():
         "status": "online"
     }
 
+# Rate limit and cap concurrent analyses (added first so CORS headers wrap its rejections)
+app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -57,6 +63,16 @@ async def startup_event():
     print(f"API will be available at: http://{host}:{port}")
     print(f"Documentation will be available at: http://{host}:{port}/docs")
 
+    # Start the analysis job workers
+    await job_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_manager.stop()
+    # Close pooled connections only once no job can use them any more
+    await http_client.close()
+    shutdown_pool()
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))